@@ -1,20 +1,36 @@
+import argparse
 import os
 import subprocess
-import re
+import sys
 import time
 
+# 카드 목록은 mic_re_0410/discovery.py 사용 (arecord -l 파싱 대신 /proc/asound)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mic_re_0410"))
+
+from discovery import identifiers, list_cards, resolve
+
+RATE = 48000
+PERIOD_SIZE = 1024   # dsnoop 주기 (샘플), capture.py HOP 과 동일
+BUFFER_SIZE = 8192
+
+MIC_NAME = "Comica_VM10 PRO"
+# mic_1, mic_2, mic_3 순서의 장치 식별자 (discovery.py), 비어 있으면 카드 번호 순서
+MIC_ORDER = []
+
 # 마이크 자동 감지 함수
 def get_mic_indices():
-    """ Automatically search microphone index after running arecord -l """
-    result = subprocess.run(["arecord", "-l"], capture_output=True, text=True)
-    lines = result.stdout.split("\n")
-
-    mic_indices = []
-    for line in lines:
-        # "Comica_VM10 PRO", "Comica_VM10 PRO_1", "Comica_VM10 PRO_2" 모두 인식
-        match = re.search(r"card (\d+): PRO(?:_\d+)? \[Comica_VM10 PRO", line)
-        if match:
-            mic_indices.append(int(match.group(1)))  # card 번호 저장
+    """ Card numbers of the microphones, ordered by MIC_ORDER when it is set """
+    cards = [card for card in list_cards() if card["capture"] and card["name"].startswith(MIC_NAME)]
+    for card in cards:
+        print(f"card {card['card']}: {card['name']}  ->  {', '.join(identifiers(card))}")
+    if MIC_ORDER:
+        try:
+            mic_indices = [card["card"] for card in resolve(dict(enumerate(MIC_ORDER)), cards).values()]
+        except ValueError as e:
+            print(e)
+            return None
+    else:
+        mic_indices = [card["card"] for card in cards]
 
     if len(mic_indices) < 3:
         print("3개의 마이크를 찾지 못했습니다. arecord -l을 실행하여 확인하세요.")
@@ -22,8 +38,50 @@ def get_mic_indices():
     
     return mic_indices
 
+# 마이크 전체를 하나의 다채널 PCM 으로 묶는 설정 (채널 0 = mic_1, 1 = mic_2, 2 = mic_3)
+def combined_pcm(mic_indices, name="mic_array"):
+    """ ALSA dsnoop (per card) + multi (one interleaved stream) + plug definitions """
+    parts = []
+    for i, card in enumerate(mic_indices):
+        parts.append(f"""
+pcm.{name}_snoop_{i + 1} {{
+    type dsnoop
+    ipc_key {2048 + i}
+    ipc_key_add_uid true
+    slave {{
+        pcm "hw:{card},0"
+        channels 1
+        rate {RATE}
+        period_size {PERIOD_SIZE}
+        buffer_size {BUFFER_SIZE}
+    }}
+}}
+""")
+
+    slaves = "\n".join(f"""    slaves.{chr(97 + i)}.pcm "{name}_snoop_{i + 1}"
+    slaves.{chr(97 + i)}.channels 1""" for i in range(len(mic_indices)))
+    bindings = "\n".join(f"""    bindings.{i}.slave {chr(97 + i)}
+    bindings.{i}.channel 0""" for i in range(len(mic_indices)))
+    parts.append(f"""
+pcm.{name}_multi {{
+    type multi
+{slaves}
+{bindings}
+    master 0
+}}
+
+pcm.{name} {{
+    type plug
+    slave.pcm "{name}_multi"
+    ttable {{
+""" + "\n".join(f"        {i}.{i} 1" for i in range(len(mic_indices))) + f"""
+    }}
+}}
+""")
+    return "".join(parts)
+
 # ALSA 설정 파일 생성 (plughw 별칭 추가)
-def create_asoundrc(mic_indices):
+def create_asoundrc(mic_indices, combined=False):
     """ Create a ~/.asoundrc file to apply ALSA microphone settings and assign a plughw alias """
     asoundrc_content = f"""
 pcm.mic_1 {{
@@ -53,6 +111,10 @@ pcm.!default {{
     capture.pcm "mic_middle"
 }}
 """
+    if combined:
+        # 카드별 스트림 3개 대신 한 번에 읽는 다채널 장치 (시작 시점이 같은 period 로 맞춰짐)
+        asoundrc_content += combined_pcm(mic_indices)
+
     asoundrc_path = os.path.expanduser("~/.asoundrc")
     
     with open(asoundrc_path, "w") as f:
@@ -66,8 +128,15 @@ pcm.!default {{
     subprocess.run(["sudo", "systemctl", "restart", "alsa-state"])
 
     print("ALSA 설정이 적용되었습니다. 'arecord -L'을 실행하여 확인하세요.")
+    if combined:
+        print(f"다채널 장치 확인: arecord -D mic_array -f S16_LE -r {RATE} -c {len(mic_indices)} test_array.wav")
 
 # 마이크 자동 설정 실행
+parser = argparse.ArgumentParser()
+parser.add_argument("--combined", action="store_true",
+                    help="mic_1~3 을 묶은 다채널 장치 mic_array (ALSA multi/dsnoop) 도 생성")
+args = parser.parse_args()
+
 mic_indices = get_mic_indices()
 if mic_indices:
-    create_asoundrc(mic_indices)
+    create_asoundrc(mic_indices, combined=args.combined)
@@ -1,31 +1,46 @@
-import socket
-import time
-
-def main():
-    server_ip = "192.168.0.53"
-    port = 6050
-
-    while True:
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.settimeout(5)
-            s.connect((server_ip, port))
-            print("Connected to server!")
-
-            while True:
-                data = s.recv(1024)
-                if not data:
-                    break
-                print(f"Received: {data.decode()}")
-        except (socket.timeout, ConnectionRefusedError):
-            print("server check (Cant Connected to Server)")
-        except Exception as e:
-            print(f"Error: {e}")
-        finally:
-            s.close()
-
-        print("Reconnecting in 5 seconds...")
-        time.sleep(5)
-
-if __name__ == "__main__":
-    main()
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mic_re_0410"))
+
+from subscriber import HitSubscriber
+
+"""
+- mic_server 방송 수신: HIT 프레임을 풀어 좌표 / 신뢰도 출력 (mic_re_0410/subscriber.py)
+- 연결이 끊기면 고정 5초 대기 대신 지수 백오프로 재연결, 재연결 시 마지막 seq 이후 타격을 서버에서 한 번에 받아 출력
+- seq 번호 빈틈 = 서버에서 버려진(느린 클라이언트 / 너무 오래 끊김) 이벤트 수
+- --state 파일을 주면 클라이언트를 다시 켜도 이어서 받음
+- heartbeat 가 HEARTBEAT_TIMEOUT 동안 없으면 재연결
+"""
+
+SERVER_IP = "192.168.0.53"
+PORT = 6050
+HEARTBEAT_TIMEOUT = 5
+
+def print_hit(hit):
+    stamp = time.strftime('%H:%M:%S', time.localtime(hit['t']))
+    late = " (재전송)" if hit["replayed"] else ""
+    if hit["status"] == "hit":
+        print(f"[{stamp}] x={hit['x']:.1f} mm, y={hit['y']:.1f} mm, 신뢰도 {hit['confidence']:.1f}%{late}")
+    else:
+        print(f"[{stamp}] {hit['status']}{late}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default=SERVER_IP)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--state", help="마지막 seq 저장 파일 (재시작 후 이어받기)")
+    args = parser.parse_args()
+
+    subscriber = HitSubscriber(args.host, args.port, print_hit, state_file=args.state, on_status=print,
+                               heartbeat_timeout=HEARTBEAT_TIMEOUT)
+    try:
+        subscriber.run()
+    except KeyboardInterrupt:
+        subscriber.stop()
+    print(f"received {subscriber.received} events ({subscriber.replayed} replayed), missed {subscriber.missed}")
+
+if __name__ == "__main__":
+    main()
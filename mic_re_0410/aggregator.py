@@ -0,0 +1,332 @@
+import argparse
+import asyncio
+import collections
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+
+from broadcast import HitBroadcaster
+from event_log import EventLogger
+from pipeline import DetectionPipeline, HIT
+from protocol import WINDOW, MSG_HELLO, MSG_WINDOW, MSG_FEATURES, ProtocolError, decode, decode_window, read_frame
+
+"""
+- 센서 노드(node.py) 여러 대에서 onset 구간을 받아 위치 추정하는 중앙 서버 (asyncio, 백그라운드 스레드)
+- 노드마다 HELLO 의 마이크 배치로 DetectionPipeline 1개 (격자는 grid_cache/ 공유, 같은 배치면 한 번만 생성)
+  새 배치의 격자는 구간을 작업 프로세스에 넘기기 전에 이 프로세스에서 한 번 생성 (작업 프로세스는 캐시 파일만 읽음)
+- WINDOW 마다 pipeline.localize() -> 이벤트에 node / seq / latency (노드 전송 ~ 위치 추정 완료, 초) 추가 후 on_event 호출
+  on_event 는 이벤트 루프 스레드에서 호출됨 (오래 걸리는 작업 금지)
+- 구간 해제 / GCC-PHAT / 위치 추정은 ProcessPoolExecutor (기본 코어 수) 에서 실행, 프로세스마다 배치별 pipeline 캐시
+  -> 과녁 여러 개를 PC 한 대로 처리, 이벤트 루프는 수신 / 순서 정리만 담당 (--workers 0 이면 루프에서 바로 처리)
+- 노드별 순서 유지: 완료된 결과도 앞 seq 가 끝날 때까지 대기 후 on_event
+- 노드별 처리 대기 구간이 MAX_PENDING 이상이면 그 노드 소켓 읽기를 멈춤 (TCP 로 노드에 역압, 노드 큐에서 오래된 것부터 버림)
+- FEATURES 는 노드별 최신 레벨만 보관 (stats(): 노드별 대기 구간 수 / 최대 / 지연 p50, p99)
+- 실행 중 STATS_INTERVAL 마다 노드별 대기 구간 수 / 지연을 출력 + 로그에 기록
+- 실행: python3 aggregator.py [--port 6060] [--workers N] [--serve 6050]  (--serve: 결과를 mic_client 로 재전송)
+"""
+
+HOST = "0.0.0.0"
+PORT = 6060
+LATENCY_HISTORY = 1000  # 노드별 최근 지연 보관 수
+MAX_PENDING = 64        # 노드별 처리 중 구간 수 상한
+STATS_INTERVAL = 10.0   # 실행 중 통계 출력 주기 (초)
+LOG_FILENAME = f"aggregator_{datetime.now().strftime('%Y_%m_%d_%H_%M_%S')}.jsonl"
+
+
+_pipelines = {}  # 작업 프로세스별 (배치 key -> DetectionPipeline)
+
+
+def _localize(key, payload, options):
+    """ Worker: WINDOW payload -> event dict or None (pipeline cached per mic layout in this process) """
+    pipeline = _pipelines.get(key)
+    if pipeline is None:
+        info = json.loads(key)
+        pipeline = _pipelines[key] = DetectionPipeline(info["mics"], info["rate"], **options)
+    window = decode_window(payload)
+    segment = {"trigger": 0, "start": 0, "onsets": window["onsets"],
+               "window": window["samples"].astype(np.float32) / 32768.0,
+               "time": window["stream_time"], "offsets": window["offsets"]}
+    return pipeline.localize(segment)
+
+
+class NodeState:
+    """ Per-node counters and in-order result queue, kept across reconnects of the same node name """
+
+    def __init__(self, info):
+        self.name = info["node"]
+        self.info = info
+        self.key = json.dumps({"mics": info["mics"], "rate": info["rate"]}, sort_keys=True)
+        self.connected = False
+        self.windows = 0
+        self.events = 0
+        self.bytes = 0
+        self.last_seq = 0
+        self.missed = 0
+        self.errors = 0  # 위치 추정 중 예외
+        self.levels = None
+        self.pending = collections.deque()  # (seq, 노드 전송 시각, future), seq 순서
+        self.max_pending = 0
+        self.latencies = collections.deque(maxlen=LATENCY_HISTORY)
+
+
+class Aggregator:
+    """ asyncio TCP server in a background thread; localizes windows streamed by sensor nodes """
+
+    def __init__(self, host=HOST, port=PORT, on_event=None, workers=None, max_pending=MAX_PENDING,
+                 on_error=None, **pipeline_options):
+        # workers: 위치 추정 프로세스 수 (None = 코어 수, 0 = 이벤트 루프에서 직접 처리)
+        # on_error(text): 위치 추정 예외 등 (None 이면 stderr 출력)
+        self.host = host
+        self.port = port
+        self.on_event = on_event
+        self.on_error = on_error
+        self._layouts = {}  # 배치 key -> 격자 준비 future
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_pending = max_pending
+        self.pipeline_options = pipeline_options
+        self.nodes = {}
+        self._pool = None
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._started = threading.Event()
+        self._error = None
+        self._tasks = set()
+        self._writers = set()
+
+    def start(self):
+        if self.workers:
+            # 스레드가 있는 프로세스에서 fork 하지 않도록 spawn 사용
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._started.wait()
+        if self._error is not None:
+            raise self._error
+        return self
+
+    def stats(self):
+        """ Per-node counters; raw values are copied on the event loop thread (nodes 는 루프에서만 바뀜) """
+        if self._loop is None:
+            snapshot = self._snapshot()
+        else:
+            snapshot = asyncio.run_coroutine_threadsafe(self._snapshot_async(), self._loop).result()
+        result = {}
+        # 백분위 계산은 호출한 스레드에서 (이벤트 루프는 복사만)
+        for name, stats, latencies in snapshot:
+            latencies = np.array(latencies) if latencies else np.array([np.nan])
+            stats["latency_p50_ms"] = float(np.nanmedian(latencies) * 1e3)
+            stats["latency_p99_ms"] = float(np.nanpercentile(latencies, 99) * 1e3)
+            result[name] = stats
+        return result
+
+    async def _snapshot_async(self):
+        return self._snapshot()
+
+    def _snapshot(self):
+        return [(name, {"connected": node.connected, "windows": node.windows, "events": node.events,
+                        "bytes": node.bytes, "missed": node.missed, "errors": node.errors,
+                        "queue": len(node.pending), "max_queue": node.max_pending,
+                        "levels": None if node.levels is None else [round(float(v), 1) for v in node.levels]},
+                 list(node.latencies))
+                for name, node in self.nodes.items()]
+
+    def stop(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop = None
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            self._server = loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+            # port=0 이면 실제 포트 기록
+            self.port = self._server.sockets[0].getsockname()[1]
+            self._loop = loop
+        except OSError as e:
+            self._error = e
+            self._started.set()
+            loop.close()
+            return
+        self._started.set()
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    def _node(self, info):
+        node = self.nodes.get(info["node"])
+        if node is None or node.info["mics"] != info["mics"] or node.info["rate"] != info["rate"]:
+            node = NodeState(info)
+            self.nodes[node.name] = node
+        return node
+
+    async def _handle(self, reader, writer):
+        self._tasks.add(asyncio.current_task())
+        self._writers.add(writer)
+        node = None
+        try:
+            kind, payload = await read_frame(reader)
+            if kind != MSG_HELLO:
+                raise ProtocolError(f"expected HELLO, got kind {kind}")
+            node = self._node(decode(kind, payload))
+            await self._prepare(node.key)
+            node.connected = True
+            while True:
+                kind, payload = await read_frame(reader)
+                node.bytes += len(payload)
+                if kind == MSG_WINDOW:
+                    self._submit(node, payload)
+                    if len(node.pending) >= self.max_pending:
+                        # 처리가 밀리면 이 노드의 수신을 멈춤 (앞 구간이 끝날 때까지)
+                        await asyncio.wait({node.pending[0][2]})
+                elif kind == MSG_FEATURES:
+                    node.levels = decode(kind, payload)["levels"]
+        except (asyncio.IncompleteReadError, ConnectionError, ProtocolError, ValueError):
+            pass
+        finally:
+            if node is not None:
+                node.connected = False
+            self._writers.discard(writer)
+            writer.close()
+            self._tasks.discard(asyncio.current_task())
+
+    async def _prepare(self, key):
+        """ Build / load a layout's TDOA grid once here, in a thread, before any worker needs it """
+        if key not in self._layouts:
+            info = json.loads(key)
+            options = self.pipeline_options
+            self._layouts[key] = self._loop.run_in_executor(
+                None, lambda: DetectionPipeline(info["mics"], info["rate"], **options))
+        try:
+            # --workers 0 이면 이 pipeline 을 그대로 사용
+            _pipelines[key] = await self._layouts[key]
+        except Exception as e:
+            self._layouts.pop(key, None)
+            self._error(f"배치 준비 실패 ({key}): {e!r}")
+            raise ProtocolError(f"bad layout: {e}") from e
+
+    def _error(self, text):
+        if self.on_error is not None:
+            self.on_error(text)
+        else:
+            print(text, file=sys.stderr)
+
+    def _submit(self, node, payload):
+        seq, t = WINDOW.unpack_from(payload)[:2]
+        node.windows += 1
+        if node.last_seq and seq > node.last_seq + 1:
+            node.missed += seq - node.last_seq - 1
+        node.last_seq = seq
+        if self._pool is not None:
+            future = self._loop.run_in_executor(self._pool, _localize, node.key, payload, self.pipeline_options)
+        else:
+            future = self._loop.create_future()
+            try:
+                future.set_result(_localize(node.key, payload, self.pipeline_options))
+            except Exception as e:
+                future.set_exception(e)
+        node.pending.append((seq, t, future))
+        node.max_pending = max(node.max_pending, len(node.pending))
+        future.add_done_callback(lambda _: self._deliver(node))
+
+    def _deliver(self, node):
+        """ Emit finished results of one node strictly in arrival order """
+        while node.pending and node.pending[0][2].done():
+            seq, t, future = node.pending.popleft()
+            if future.cancelled() or future.exception() is not None:
+                node.errors += 1
+                self._error(f"[{node.name}] seq {seq} 위치 추정 실패: "
+                            f"{'cancelled' if future.cancelled() else repr(future.exception())}")
+                continue
+            event = future.result()
+            if event is None:
+                continue
+            latency = time.time() - t
+            node.latencies.append(latency)
+            node.events += 1
+            event.update(node=node.name, seq=seq, latency=latency)
+            if self.on_event is not None:
+                self.on_event(event)
+
+    async def _shutdown(self):
+        self._server.close()
+        for writer in list(self._writers):
+            writer.close()
+        if self._tasks:
+            await asyncio.wait(set(self._tasks), timeout=1.0)
+        # 처리 중인 구간은 끝까지 전달 (루프를 멈춘 뒤 완료 콜백이 오지 않도록)
+        pending = {future for node in self.nodes.values() for _, _, future in node.pending}
+        if pending:
+            await asyncio.wait(pending, timeout=10.0)
+        await self._server.wait_closed()
+
+
+def report(stats, logger):
+    """ Print + log one line per node: queue depth and latency """
+    for name, node in stats.items():
+        logger.log("node_stats", node=name, **node)
+        print(f"{name}: {node['windows']} windows, {node['events']} events, missed {node['missed']}, "
+              f"queue {node['queue']} (max {node['max_queue']}), "
+              f"latency p50 {node['latency_p50_ms']:.1f} ms / p99 {node['latency_p99_ms']:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT, help="센서 노드 접속 포트")
+    parser.add_argument("--workers", type=int, help="위치 추정 프로세스 수 (기본: 코어 수, 0: 프로세스 없이)")
+    parser.add_argument("--serve", type=int, metavar="PORT", help="결과를 이 포트로 mic_client 에 재전송")
+    args = parser.parse_args()
+
+    logger = EventLogger(LOG_FILENAME)
+    broadcaster = HitBroadcaster(args.host, args.serve).start() if args.serve else None
+
+    def on_event(event):
+        record = dict(event)
+        record["stream_time"] = record.pop("time")
+        logger.log("impact", **record)
+        if broadcaster is not None:
+            broadcaster.publish(event)
+        if event["status"] == HIT:
+            print(f"[{event['node']}] 타격음 좌표(추정) = (x={event['x']:.1f} mm, y={event['y']:.1f} mm), "
+                  f"신뢰도 = {event['confidence']:.1f}%, 지연 = {event['latency'] * 1e3:.1f} ms")
+        else:
+            print(f"[{event['node']}] {event['status']}")
+
+    def on_error(text):
+        print(text)
+        logger.message(text)
+
+    aggregator = Aggregator(args.host, args.port, on_event, args.workers, on_error=on_error).start()
+    print(f"Aggregator listening on {args.host}:{aggregator.port}, {aggregator.workers} workers (Ctrl+C to stop)")
+    logger.message("Aggregator started")
+    try:
+        while True:
+            time.sleep(STATS_INTERVAL)
+            report(aggregator.stats(), logger)
+    except KeyboardInterrupt:
+        print("Aggregator stopped by user.")
+    finally:
+        aggregator.stop()
+        if broadcaster is not None:
+            broadcaster.stop()
+        report(aggregator.stats(), logger)
+        logger.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+import solver
+
+"""
+- 여러 이벤트 위치 추정을 한 번에 처리 (N, M) 시간차 -> (N, 2) 좌표 / residual / 신뢰도
+- 이벤트가 아주 많으면 프로세스 풀로 나눠서 처리 (workers 지정 시)
+"""
+
+RESIDUAL_THRESHOLD = 0.005
+POOL_CHUNK = 50000  # 프로세스 하나가 처리할 이벤트 수
+
+
+def confidence_from_residual(residual, residual_threshold=RESIDUAL_THRESHOLD):
+    """ Same confidence (%) formula as detect_ver3, vectorized """
+    return np.maximum(0.0, 1 - np.asarray(residual) / residual_threshold) * 100
+
+
+def _solve_chunk(args):
+    time_diffs, mic_positions, sound_speed, x_limit, y_limit, clamp = args
+    return solver.solve(time_diffs, mic_positions, sound_speed, x_limit, y_limit, clamp)
+
+
+def localize_batch(time_diffs, mic_positions, sound_speed=solver.SOUND_SPEED,
+                   residual_threshold=RESIDUAL_THRESHOLD, x_limit=solver.RECT_X_LIMIT,
+                   y_limit=solver.RECT_Y_LIMIT, clamp=True, workers=None, chunk_size=POOL_CHUNK):
+    """
+    time_diffs: (N, M) 도달 시간차 (초), mic_positions: (M, 2) mm
+    workers: None 이면 현재 프로세스에서 처리, 0 이면 CPU 코어 수만큼
+    return: positions (N, 2), residuals (N,), confidences (N,)
+    """
+    time_diffs = np.atleast_2d(np.asarray(time_diffs, dtype=np.float64))
+    mic_positions = np.asarray(mic_positions, dtype=np.float64)
+    if time_diffs.shape[1] != len(mic_positions):
+        raise ValueError(f"time_diffs 열 수 {time_diffs.shape[1]} != 마이크 수 {len(mic_positions)}")
+
+    if workers is None or len(time_diffs) <= chunk_size:
+        positions, residuals = solver.solve(time_diffs, mic_positions, sound_speed, x_limit, y_limit, clamp)
+    else:
+        chunks = [(time_diffs[i:i + chunk_size], mic_positions, sound_speed, x_limit, y_limit, clamp)
+                  for i in range(0, len(time_diffs), chunk_size)]
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            results = list(pool.map(_solve_chunk, chunks))
+        positions = np.concatenate([r[0] for r in results])
+        residuals = np.concatenate([r[1] for r in results])
+
+    return positions, residuals, confidence_from_residual(residuals, residual_threshold)
@@ -0,0 +1,105 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+
+import detect_ver4 as live
+from pipeline import DetectionPipeline, HIT
+from synth import synthesize, random_sources
+
+"""
+- 합성 타격음으로 전체 파이프라인 (onset -> GCC-PHAT -> 위치 추정) 정확도 / 속도 측정
+- 출력: 감지율, 위치 오차 p50/p90, 처리 속도 (실시간 대비 배속, events/s = 감지 이벤트 수 / 전체 처리 시간),
+  이벤트가 나온 청크의 처리 시간 p50/p99 (process() 한 번, segmenter 의 최대 1청크 대기는 포함 안 됨)
+- --save 로 결과를 bench_baseline.json 에 저장, 다음 실행부터 기준값과 비교
+- 실행: python3 bench_pipeline.py [--events 200] [--save]
+"""
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+EVENT_SPACING = 0.5   # 타격 간격 (초)
+MATCH_WINDOW = 0.02   # 감지 시간과 실제 시간 허용 차이 (초)
+
+SCENARIOS = {
+    "clean": {"noise_db": -70.0, "reverb_seconds": 0.0},
+    "noisy+reverb": {"noise_db": -45.0, "reverb_seconds": 0.05},
+}
+
+
+def run_scenario(num_events, noise_db, reverb_seconds, seed=0):
+    rng = np.random.default_rng(seed)
+    mic_positions = np.array(list(live.MIC_POSITIONS.values()), dtype=np.float64)
+    sources = random_sources(num_events, live.RECT_X_LIMIT, live.RECT_Y_LIMIT, seed)
+    # 청크 경계에 걸리는 경우도 포함되도록 시간을 흔듦
+    times = 1.0 + np.arange(num_events) * EVENT_SPACING + rng.uniform(0, 0.1, num_events)
+    duration = times[-1] + 1.0
+    audio = synthesize(sources, times, mic_positions, duration, live.RATE, live.SOUND_SPEED,
+                       noise_db=noise_db, reverb_seconds=reverb_seconds, seed=seed)
+
+    pipeline = DetectionPipeline(live.MIC_POSITIONS, live.RATE, live.SOUND_SPEED, live.ONSET_RATIO_DB,
+                                 live.RESIDUAL_THRESHOLD, live.GCC_QUALITY_MIN, live.RECT_X_LIMIT, live.RECT_Y_LIMIT)
+    signals = audio.astype(np.float32) / 32768.0
+    events, chunk_times = [], []
+    start = time.perf_counter()
+    for pos in range(0, signals.shape[1] - live.CHUNK + 1, live.CHUNK):
+        t0 = time.perf_counter()
+        chunk_events = pipeline.process(signals[:, pos:pos + live.CHUNK])
+        if chunk_events:
+            chunk_times.append(time.perf_counter() - t0)
+            events.extend(chunk_events)
+    elapsed = time.perf_counter() - start
+
+    # 감지 이벤트 <-> 실제 타격 매칭 (가장 가까운 마이크 도달 시각 기준)
+    first_arrival = times + np.linalg.norm(sources[:, None] - mic_positions[None], axis=2).min(axis=1) / live.SOUND_SPEED
+    errors, matched = [], set()
+    for event in events:
+        k = int(np.argmin(np.abs(first_arrival - event["time"])))
+        if abs(first_arrival[k] - event["time"]) > MATCH_WINDOW or k in matched:
+            continue
+        matched.add(k)
+        if event["status"] == HIT:
+            errors.append(np.hypot(event["x"] - sources[k, 0], event["y"] - sources[k, 1]))
+
+    errors = np.array(errors) if errors else np.array([np.nan])
+    chunk_times = np.array(chunk_times) if chunk_times else np.array([np.nan])
+    return {
+        "detection_rate": len(matched) / num_events,
+        "hit_rate": int(np.isfinite(errors).sum()) / num_events,
+        "error_p50_mm": float(np.nanmedian(errors)),
+        "error_p90_mm": float(np.nanpercentile(errors, 90)),
+        "realtime_factor": duration / elapsed,
+        "events_per_second": len(events) / elapsed,
+        "event_chunk_p50_ms": float(np.nanmedian(chunk_times) * 1e3),
+        "event_chunk_p99_ms": float(np.nanpercentile(chunk_times, 99) * 1e3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--save", action="store_true", help="결과를 기준값으로 저장")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as f:
+            baseline = json.load(f)
+
+    results = {}
+    for name, params in SCENARIOS.items():
+        results[name] = run_scenario(args.events, **params)
+        print(f"[{name}] {args.events} events")
+        for key, value in results[name].items():
+            line = f"  {key:<18} {value:10.3f}"
+            if name in baseline and key in baseline[name]:
+                line += f"   (baseline {baseline[name][key]:10.3f}, {value - baseline[name][key]:+.3f})"
+            print(line)
+
+    if args.save:
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {BASELINE_FILE}")
+
+
+if __name__ == "__main__":
+    main()
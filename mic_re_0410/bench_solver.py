@@ -0,0 +1,90 @@
+import time
+import numpy as np
+from scipy.optimize import minimize
+
+import solver
+from batch import localize_batch
+
+"""
+- solver.py (닫힌 해 + Gauss-Newton) vs 기존 Nelder-Mead 속도 / 정확도 비교
+- 실행: python3 bench_solver.py
+- 마이크 3개 (일직선 아님) 배치는 시간차가 같은 해가 2개 존재할 수 있음
+  두 방식 모두 마이크 중심에 가까운 해를 선택하므로 오차 분포가 비슷하게 나옴
+"""
+
+SOUND_SPEED = 343000  # mm/s
+NUM_EVENTS = 500
+NOISE_STD = 2e-6  # 시간차 잡음 (초)
+LARGE_BATCH = 200000  # 프로세스 풀 비교용 이벤트 수
+
+GEOMETRIES = {
+    "detect_ver3": np.array([[100, 0], [200, 100], [300, 0]], dtype=float),
+    "ver6 (일직선)": np.array([[100, 0], [200, 0], [300, 0]], dtype=float),
+}
+
+
+def nelder_mead(time_diffs, mic_positions):
+    """ detect_ver3 의 estimate_impact_location 과 동일 """
+    def loss(pos):
+        dists = np.linalg.norm(mic_positions - pos, axis=1)
+        arrivals = dists / SOUND_SPEED
+        relative = arrivals - arrivals.min()
+        return np.sum((relative - time_diffs) ** 2)
+
+    guess = np.mean(mic_positions, axis=0)
+    result = minimize(loss, guess, method='Nelder-Mead')
+    x, y = result.x
+    x = max(0, min(x, 400))
+    y = max(0, min(y, 1000))
+    return np.array([x, y]), result.fun
+
+
+def make_events(mic_positions, rng):
+    sources = np.column_stack([rng.uniform(0, 400, NUM_EVENTS), rng.uniform(0, 1000, NUM_EVENTS)])
+    arrivals = np.linalg.norm(sources[:, None, :] - mic_positions[None, :, :], axis=2) / SOUND_SPEED
+    arrivals += rng.normal(0, NOISE_STD, arrivals.shape)
+    return sources, arrivals - arrivals.min(axis=1, keepdims=True)
+
+
+def run(name, fn, sources, time_diffs, mic_positions):
+    start = time.perf_counter()
+    results = [fn(t, mic_positions) for t in time_diffs]
+    elapsed = time.perf_counter() - start
+
+    positions = np.array([r[0] for r in results])
+    residuals = np.array([r[1] for r in results])
+    error = np.linalg.norm(positions - sources, axis=1)
+    print(f"  {name:<14} {elapsed / len(sources) * 1e6:9.1f} us/event   "
+          f"err p50={np.median(error):7.2f} mm  p90={np.percentile(error, 90):7.2f} mm   "
+          f"residual p50={np.median(residuals):.2e}")
+    return elapsed
+
+
+def main():
+    rng = np.random.default_rng(0)
+    for geometry, mic_positions in GEOMETRIES.items():
+        sources, time_diffs = make_events(mic_positions, rng)
+        print(f"[{geometry}] {NUM_EVENTS} events")
+        t_nm = run("Nelder-Mead", nelder_mead, sources, time_diffs, mic_positions)
+        t_gn = run("closed+GN", solver.estimate_impact_location, sources, time_diffs, mic_positions)
+
+        start = time.perf_counter()
+        solver.solve(time_diffs, mic_positions)
+        t_batch = time.perf_counter() - start
+        print(f"  {'closed+GN batch':<14} {t_batch / NUM_EVENTS * 1e6:9.1f} us/event")
+        print(f"  speedup: {t_nm / t_gn:.1f}x (single), {t_nm / t_batch:.1f}x (batch)")
+
+    # 대량 배치: 단일 프로세스 vs 프로세스 풀
+    mic_positions = GEOMETRIES["detect_ver3"]
+    time_diffs = np.tile(make_events(mic_positions, rng)[1], (LARGE_BATCH // NUM_EVENTS, 1))
+    for workers in (None, 0):
+        start = time.perf_counter()
+        localize_batch(time_diffs, mic_positions, workers=workers)
+        elapsed = time.perf_counter() - start
+        label = "single process" if workers is None else "process pool"
+        print(f"[localize_batch {label}] {len(time_diffs)} events: {elapsed:.2f} s "
+              f"({len(time_diffs) / elapsed:.0f} events/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+import asyncio
+import collections
+import itertools
+import socket
+import struct
+import threading
+import time
+
+from protocol import (MSG_SUBSCRIBE, ProtocolError, decode, encode_hit, encode_heartbeat, encode_replay,
+                      encode_welcome, read_frame)
+
+"""
+- 타격 결과를 여러 클라이언트(점수판 등)에 실시간 전송하는 asyncio 서버
+- 감지 스레드는 publish() 만 호출 (프레임 인코딩 후 이벤트 루프에 넘기고 바로 반환, 네트워크로 멈추지 않음)
+- 클라이언트마다 크기 제한 큐, 가득 차면 가장 오래된 프레임을 버림 (느린 클라이언트가 감지를 멈추지 못함)
+- 커널 / transport 송신 버퍼를 작게 제한하고 큐에서 MAX_FRAME_AGE 보다 오래 기다린 프레임은 보내지 않고 버림
+  (큐의 마지막 프레임은 버리지 않음 -> 가장 최근 타격은 항상 전달)
+  -> 느린 클라이언트의 지연은 MAX_FRAME_AGE + 송신 / 수신 소켓 버퍼 분량 정도로 제한, 그 이상 밀린 타격은 건너뜀
+- 버린 개수는 클라이언트별로 기록, 클라이언트는 seq 번호 빈틈으로 확인 가능
+- 최근 REPLAY_SIZE 개 HIT 를 링 버퍼에 보관: 재접속한 클라이언트(subscriber.py)가 SUBSCRIBE 로 마지막 seq 를 보내면
+  그 뒤 HIT 를 REPLAY 프레임으로 한 번에 보낸 뒤 실시간 전송 (끊긴 동안의 타격도 빠짐없이 받음)
+- 접속 즉시 실시간 전송 대상에 등록 (SUBSCRIBE 를 기다리는 동안의 HIT 는 큐에 쌓임, 그 전 HIT 는 REPLAY 로)
+- WELCOME / REPLAY 는 큐를 거치지 않고 바로 소켓에 씀 (버려지지 않음), 다 보낸 뒤 큐 전송 시작
+- 세션 번호 = 서버 시작 시각, 서버가 재시작되면 바뀜 -> 클라이언트는 seq 를 새로 셈
+- SUBSCRIBE 없는 (예전) 클라이언트는 SUBSCRIBE_TIMEOUT 후 그동안 쌓인 HIT 부터 실시간 전송을 받음
+"""
+
+HOST = "0.0.0.0"
+PORT = 6050
+QUEUE_SIZE = 1024          # 클라이언트별 대기 프레임 수
+HEARTBEAT_INTERVAL = 1.0   # 초
+SEND_BUFFER = 4 * 1024     # 클라이언트별 송신 버퍼 (byte), 이 이상 밀리면 프레임은 큐에서 대기
+MAX_FRAME_AGE = 0.5        # 큐에서 이보다 오래 기다린 프레임은 버림 (초)
+REPLAY_SIZE = 10000        # 재접속 시 다시 보낼 수 있는 최근 HIT 수
+SUBSCRIBE_TIMEOUT = 0.5    # 접속 후 SUBSCRIBE 대기 (초)
+
+
+class _Client:
+    """ One subscriber: bounded drop-oldest frame queue drained by its own writer task """
+
+    def __init__(self, writer, queue_size):
+        self.writer = writer
+        self.addr = writer.get_extra_info("peername")
+        self.frames = collections.deque(maxlen=queue_size)  # (큐에 넣은 시각, 프레임)
+        self.ready = asyncio.Event()
+        self.since = 0.0  # 큐 전송 시작 시각 (그 전에 쌓인 프레임은 이때부터 나이를 셈)
+        self.sent = 0
+        self.dropped = 0
+        self.replayed = 0
+
+    def push(self, frame):
+        if len(self.frames) == self.frames.maxlen:
+            self.dropped += 1
+        self.frames.append((time.monotonic(), frame))
+        self.ready.set()
+
+    def take(self, max_bytes, max_age):
+        """ Pop queued frames up to max_bytes, dropping those older than max_age (never the newest) """
+        oldest = time.monotonic() - max_age
+        batch, size = [], 0
+        while self.frames and size < max_bytes:
+            queued, frame = self.frames.popleft()
+            if max(queued, self.since) < oldest and self.frames:
+                self.dropped += 1
+                continue
+            batch.append(frame)
+            size += len(frame)
+        return batch
+
+
+class HitBroadcaster:
+    """ asyncio TCP server in a background thread; publish() is safe to call from any thread """
+
+    def __init__(self, host=HOST, port=PORT, queue_size=QUEUE_SIZE, heartbeat=HEARTBEAT_INTERVAL,
+                 replay_size=REPLAY_SIZE):
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.session = time.time_ns()
+        self.clients = set()
+        self.seq = 0
+        self.history = collections.deque(maxlen=replay_size)  # (seq, HIT 프레임), 이벤트 루프 스레드에서만 수정
+        self.disconnected = []  # 끊긴 클라이언트 (addr, sent, dropped)
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._started = threading.Event()
+        self._error = None
+        self._tasks = set()  # heartbeat + 클라이언트 처리 task
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._started.wait()
+        if self._error is not None:
+            raise self._error
+        return self
+
+    def publish(self, event, t=None):
+        """ Encode one pipeline event and fan it out; returns immediately """
+        if self._loop is None:
+            return
+        self.seq += 1
+        self._loop.call_soon_threadsafe(self._publish, self.seq, encode_hit(self.seq, event, t))
+
+    def stats(self):
+        """ Snapshot of client counters, taken on the event loop thread (clients 는 루프에서만 바뀜) """
+        if self._loop is None:
+            return self._stats()
+        return asyncio.run_coroutine_threadsafe(self._snapshot(), self._loop).result()
+
+    async def _snapshot(self):
+        return self._stats()
+
+    def _stats(self):
+        return {"clients": len(self.clients), "published": self.seq,
+                "dropped": {str(c.addr): c.dropped for c in self.clients},
+                "replayed": {str(c.addr): c.replayed for c in self.clients}}
+
+    def stop(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop = None
+
+    def _publish(self, seq, frame):
+        self.history.append((seq, frame))
+        self._fanout(frame)
+
+    def _fanout(self, frame):
+        for client in self.clients:
+            client.push(frame)
+
+    def _replay(self, session, last_seq, until):
+        """ HIT frames a subscriber missed up to seq until (all buffered ones if it saw another server session) """
+        if not self.history:
+            return []
+        first = self.history[0][0]
+        start = 0
+        if session == self.session:
+            start = max(0, last_seq - first + 1)
+        end = max(0, until - first + 1)
+        return [frame for _, frame in itertools.islice(self.history, start, end)]
+
+    async def _subscribe(self, reader):
+        """ (session, last_seq) from the client's SUBSCRIBE, None for a live-only client """
+        try:
+            kind, payload = await asyncio.wait_for(read_frame(reader), SUBSCRIBE_TIMEOUT)
+            message = decode(kind, payload) if kind == MSG_SUBSCRIBE else None
+        except asyncio.TimeoutError:
+            return None
+        except (ProtocolError, struct.error):
+            return None
+        if message is None or not message["session"]:
+            return None
+        return message["session"], message["last_seq"]
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            self._server = loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+            # port=0 이면 실제 포트 기록
+            self.port = self._server.sockets[0].getsockname()[1]
+            self._loop = loop
+            self._heartbeat_task = loop.create_task(self._heartbeat())
+        except OSError as e:
+            self._error = e
+            self._started.set()
+            loop.close()
+            return
+        self._started.set()
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            frame = encode_heartbeat()
+            # 보낼 프레임이 밀려 있으면 heartbeat 불필요 (큐 마지막이 heartbeat 면 마지막 HIT 가 만료로 버려질 수 있음)
+            for client in self.clients:
+                if not client.frames:
+                    client.push(frame)
+
+    async def _handle(self, reader, writer):
+        self._tasks.add(asyncio.current_task())
+        client = _Client(writer, self.queue_size)
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER)
+        writer.transport.set_write_buffer_limits(high=SEND_BUFFER)
+        # 등록 시점 (joined) 까지는 링 버퍼에서 REPLAY, 이후 HIT 는 큐로 -> 빠지거나 겹치는 seq 없음
+        joined = self.history[-1][0] if self.history else 0
+        self.clients.add(client)
+        sender = closed = None
+        try:
+            try:
+                resume = await self._subscribe(reader)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                return
+            first = self.history[0][0] if self.history else 0
+            frames = [encode_welcome(self.session, first, joined)]
+            if resume is not None:
+                missed = self._replay(*resume, joined)
+                client.replayed = len(missed)
+                frames.extend(encode_replay(missed))
+            # 큐 (drop-oldest / 만료) 를 거치지 않고 바로 씀, 그동안 실시간 HIT 는 큐에 쌓임
+            writer.write(b"".join(frames))
+            client.sent += len(frames)
+            try:
+                await writer.drain()
+            except (ConnectionError, OSError):
+                return
+            client.since = time.monotonic()
+            sender = asyncio.ensure_future(self._send(client))
+            # 이후 클라이언트가 보내는 데이터는 없음 -> EOF 로 연결 종료 감지
+            closed = asyncio.ensure_future(reader.read())
+            await asyncio.wait({sender, closed}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (sender, closed):
+                if task is not None:
+                    task.cancel()
+            self.clients.discard(client)
+            self.disconnected.append((client.addr, client.sent, client.dropped))
+            writer.close()
+            self._tasks.discard(asyncio.current_task())
+
+    async def _send(self, client):
+        try:
+            while True:
+                await client.ready.wait()
+                client.ready.clear()
+                # transport 버퍼가 SEND_BUFFER 아래로 빠질 때까지 (drain) 나머지는 큐에서 대기 / 만료
+                while client.frames:
+                    batch = client.take(SEND_BUFFER, MAX_FRAME_AGE)
+                    if not batch:
+                        break
+                    client.writer.write(b"".join(batch))
+                    client.sent += len(batch)
+                    await client.writer.drain()
+        except (ConnectionError, OSError):
+            pass
+
+    async def _shutdown(self):
+        # 연결을 닫으면 각 _handle 이 EOF 를 받고 스스로 끝남
+        self._heartbeat_task.cancel()
+        self._server.close()
+        for client in list(self.clients):
+            client.writer.close()
+        if self._tasks:
+            await asyncio.wait(set(self._tasks), timeout=1.0)
+        await self._server.wait_closed()
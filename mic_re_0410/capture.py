@@ -0,0 +1,373 @@
+import threading
+import time
+import wave
+import numpy as np
+
+"""
+- 콜백 기반 연속 캡처 엔진
+- 마이크별 링 버퍼 (단일 생산자 / 단일 소비자, lock 없음)
+- 읽기 사이 공백 없음 -> 청크 사이에 들어온 타격음도 놓치지 않음
+- WAV 재생 장치 (오디오 장비 없이 테스트용)
+- 다채널 장치 (mic_setup.py --combined 로 만든 ALSA mic_array) 하나를 한 스트림으로 읽기 가능
+  -> period 당 호출 1번, 모든 마이크 샘플이 같은 프레임 위치로 정렬
+- 마이크별 장치는 스트림 시작 시각이 서로 다름 -> 첫 ALIGN_SECONDS 동안 콜백 시각으로 시작 시각을 추정,
+  CaptureReader.align() 이 앞부분을 잘라 시작을 맞춤 (recorder.py 와 같은 방식, 이후 드리프트는 drift.py)
+"""
+
+RATE = 48000
+HOP = 1024              # 콜백 1회당 샘플 수
+BUFFER_SECONDS = 5.0    # 링 버퍼 길이 (초)
+ALIGN_SECONDS = 1.0     # 스트림 시작 시각 추정 구간 (초)
+
+
+class RingBuffer:
+    """ Single-producer / single-consumer ring buffer indexed by absolute sample position """
+
+    def __init__(self, capacity, dtype=np.int16):
+        self.capacity = int(capacity)
+        self.buffer = np.zeros(self.capacity, dtype=dtype)
+        self.write_pos = 0  # 지금까지 기록된 누적 샘플 수
+
+    def write(self, samples):
+        n = len(samples)
+        if n == 0:
+            return
+        if n > self.capacity:
+            samples = samples[-self.capacity:]
+            self.write_pos += n - self.capacity
+            n = self.capacity
+
+        start = self.write_pos % self.capacity
+        end = start + n
+        if end <= self.capacity:
+            self.buffer[start:end] = samples
+        else:
+            split = self.capacity - start
+            self.buffer[start:] = samples[:split]
+            self.buffer[:end - self.capacity] = samples[split:]
+
+        # 데이터를 먼저 쓰고 위치를 나중에 갱신 -> 소비자는 완성된 샘플만 봄
+        self.write_pos += n
+
+    def oldest_pos(self):
+        return max(0, self.write_pos - self.capacity)
+
+    def read(self, pos, n):
+        """ Copy n samples starting at absolute position pos (None if not yet written or overwritten) """
+        if pos < self.oldest_pos() or pos + n > self.write_pos:
+            return None
+
+        start = pos % self.capacity
+        end = start + n
+        if end <= self.capacity:
+            out = self.buffer[start:end].copy()
+        else:
+            out = np.concatenate((self.buffer[start:], self.buffer[:end - self.capacity]))
+
+        # 복사 도중 생산자가 덮어썼는지 확인
+        if pos < self.oldest_pos():
+            return None
+        return out
+
+    def read_into(self, pos, out):
+        """ Like read() but copies (and casts) into a preallocated 1-D array; False if unavailable """
+        n = len(out)
+        if pos < self.oldest_pos() or pos + n > self.write_pos:
+            return False
+
+        start = pos % self.capacity
+        end = start + n
+        if end <= self.capacity:
+            out[:] = self.buffer[start:end]
+        else:
+            split = self.capacity - start
+            out[:split] = self.buffer[start:]
+            out[split:] = self.buffer[:end - self.capacity]
+        return pos >= self.oldest_pos()
+
+
+class WavReplayDevice:
+    """ Offline stand-in for a microphone that replays a mono int16 WAV file through the callback """
+
+    def __init__(self, filename, hop=HOP, realtime=True, loop=False, multichannel=False):
+        self.filename = filename
+        self.hop = hop
+        self.multichannel = multichannel
+        self.realtime = realtime
+        self.loop = loop
+        self.rate = None
+        self._thread = None
+        self._running = False
+
+        with wave.open(filename, "rb") as wf:
+            if wf.getsampwidth() != 2:
+                raise ValueError(f"{filename}: 16-bit WAV만 지원합니다")
+            self.rate = wf.getframerate()
+            channels = wf.getnchannels()
+            data = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+        self.channels = channels if multichannel else 1
+        if multichannel:
+            # 다채널 장치 대신 재생: 블록은 (hop, channels)
+            self.samples = data.reshape(-1, channels)
+        else:
+            # 다채널 파일은 첫 번째 채널만 사용
+            self.samples = data[::channels] if channels > 1 else data
+
+    def start(self, callback):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, args=(callback,), daemon=True)
+        self._thread.start()
+
+    def _run(self, callback):
+        period = self.hop / self.rate
+        next_time = time.monotonic()
+        pos = 0
+        while self._running:
+            if pos >= len(self.samples):
+                if not self.loop:
+                    break
+                pos = 0
+            block = self.samples[pos:pos + self.hop]
+            pos += self.hop
+            callback(block)
+
+            if self.realtime:
+                next_time += period
+                delay = next_time - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+        self._running = False
+
+    def is_active(self):
+        return self._running
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def find_device_index(name):
+    """ pyaudio index of the input device whose name contains name (e.g. "mic_array") """
+    import pyaudio
+
+    pa = pyaudio.PyAudio()
+    try:
+        for i in range(pa.get_device_count()):
+            info = pa.get_device_info_by_index(i)
+            if name in info["name"] and info["maxInputChannels"] > 0:
+                return i
+    finally:
+        pa.terminate()
+    raise ValueError(f"입력 장치 '{name}' 를 찾지 못했습니다 (mic_setup.py --combined 실행 확인)")
+
+
+class CaptureEngine:
+    """ Opens every device with a stream callback and feeds each one into its own ring buffer """
+
+    def __init__(self, devices, rate=RATE, hop=HOP, buffer_seconds=BUFFER_SECONDS, backend="pyaudio",
+                 channels=None):
+        # devices: {"left": 3, ...} (장치 인덱스) 또는 {"left": WavReplayDevice(...), ...}
+        # channels 를 주면 devices 는 다채널 장치 하나 (인덱스 / 이름 / WavReplayDevice(multichannel=True)),
+        # channels: {"left": 2, ...} 마이크별 채널 번호
+        self.devices = devices
+        self.channels = channels
+        self.rate = rate
+        self.hop = hop
+        self.backend = backend
+        mics = channels if channels is not None else devices
+        self.buffers = {mic: RingBuffer(int(rate * buffer_seconds)) for mic in mics}
+        self.overflows = {mic: 0 for mic in mics}
+        self.data_ready = threading.Event()
+        self.taps = []  # 콜백에서 (mic, samples) 로 호출되는 함수 (레벨 미터 등)
+        self.start_time = {}  # 마이크별 첫 샘플의 monotonic 시각 추정
+        self.align_samples = int(rate * ALIGN_SECONDS)
+        self._streams = {}
+        self._pa = None
+
+    def _on_samples(self, mic, samples):
+        buf = self.buffers[mic]
+        buf.write(samples)
+        if buf.write_pos <= self.align_samples:
+            # 콜백은 늦게 불릴 수만 있음 -> 가장 이른 추정값이 실제 시작 시각에 가장 가까움
+            start = time.monotonic() - buf.write_pos / self.rate
+            self.start_time[mic] = min(self.start_time.get(mic, start), start)
+        for tap in self.taps:
+            tap(mic, samples)
+        self.data_ready.set()
+
+    def _on_frames(self, frames):
+        """ Interleaved (n, channels) block from a multichannel device -> every mic's ring buffer """
+        for mic, channel in self.channels.items():
+            self.buffers[mic].write(frames[:, channel])
+        for tap in self.taps:
+            for mic, channel in self.channels.items():
+                tap(mic, frames[:, channel])
+        self.data_ready.set()
+
+    def _count_overflow(self, mic):
+        for name in (self.overflows if mic is None else [mic]):
+            self.overflows[name] += 1
+
+    def add_tap(self, tap):
+        """ Register a light-weight function called from the capture callback with (mic, samples) """
+        self.taps.append(tap)
+
+    def _open_pyaudio(self, mic, index, channels=1):
+        # mic 이 None 이면 다채널 장치 (모든 마이크를 한 스트림으로)
+        import pyaudio
+
+        if self._pa is None:
+            self._pa = pyaudio.PyAudio()
+        if isinstance(index, str):
+            index = find_device_index(index)
+
+        def callback(in_data, frame_count, time_info, status):
+            if status & pyaudio.paInputOverflow:
+                self._count_overflow(mic)
+            samples = np.frombuffer(in_data, dtype=np.int16)
+            if mic is None:
+                self._on_frames(samples.reshape(-1, channels))
+            else:
+                self._on_samples(mic, samples)
+            return (None, pyaudio.paContinue)
+
+        stream = self._pa.open(format=pyaudio.paInt16,
+                               channels=channels,
+                               rate=self.rate,
+                               input=True,
+                               input_device_index=index,
+                               frames_per_buffer=self.hop,
+                               stream_callback=callback)
+        stream.start_stream()
+        return stream
+
+    def _open_sounddevice(self, mic, index, channels=1):
+        import sounddevice as sd
+
+        def callback(indata, frames, time_info, status):
+            if status.input_overflow:
+                self._count_overflow(mic)
+            if mic is None:
+                self._on_frames(indata)
+            else:
+                self._on_samples(mic, indata[:, 0])
+
+        stream = sd.InputStream(device=index,
+                                channels=channels,
+                                samplerate=self.rate,
+                                dtype="int16",
+                                blocksize=self.hop,
+                                callback=callback)
+        stream.start()
+        return stream
+
+    def start(self):
+        if self.channels is not None:
+            self._start_multichannel()
+            return
+        for mic, device in self.devices.items():
+            if isinstance(device, WavReplayDevice):
+                if device.rate != self.rate:
+                    raise ValueError(f"{mic}: WAV 샘플링 레이트 {device.rate} != {self.rate}")
+                device.start(lambda samples, mic=mic: self._on_samples(mic, samples))
+                self._streams[mic] = device
+            elif self.backend == "sounddevice":
+                self._streams[mic] = self._open_sounddevice(mic, device)
+            else:
+                self._streams[mic] = self._open_pyaudio(mic, device)
+
+    def _start_multichannel(self):
+        device = self.devices
+        num_channels = max(self.channels.values()) + 1
+        if isinstance(device, WavReplayDevice):
+            if device.rate != self.rate:
+                raise ValueError(f"WAV 샘플링 레이트 {device.rate} != {self.rate}")
+            if device.channels < num_channels:
+                raise ValueError(f"{device.filename}: 채널 {device.channels}개 < 필요 {num_channels}개")
+            device.start(self._on_frames)
+            self._streams["array"] = device
+        elif self.backend == "sounddevice":
+            self._streams["array"] = self._open_sounddevice(None, device, num_channels)
+        else:
+            self._streams["array"] = self._open_pyaudio(None, device, num_channels)
+
+    def is_active(self):
+        return any(s.is_active() if hasattr(s, "is_active") else s.active for s in self._streams.values())
+
+    def stop(self):
+        for stream in self._streams.values():
+            if isinstance(stream, WavReplayDevice):
+                stream.stop()
+            elif self.backend == "sounddevice":
+                stream.stop()
+                stream.close()
+            else:
+                stream.stop_stream()
+                stream.close()
+        self._streams = {}
+        if self._pa is not None:
+            self._pa.terminate()
+            self._pa = None
+
+    def reader(self):
+        return CaptureReader(self)
+
+
+class CaptureReader:
+    """ Consumer side: pulls aligned, gap-free blocks from every mic's ring buffer """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.positions = {mic: buf.write_pos for mic, buf in engine.buffers.items()}
+        self.dropped = {mic: 0 for mic in engine.buffers}
+
+    def available(self):
+        return min(self.engine.buffers[mic].write_pos - pos for mic, pos in self.positions.items())
+
+    def _wait(self, n, timeout):
+        """ Block until every mic has n new samples; False on timeout or when capture stopped """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.available() < n:
+            self.engine.data_ready.clear()
+            if self.available() >= n:
+                break
+            if not self.engine.is_active():
+                return False
+            wait = None if deadline is None else deadline - time.monotonic()
+            if wait is not None and wait <= 0:
+                return False
+            self.engine.data_ready.wait(wait if wait is not None else 0.5)
+        return True
+
+    def align(self, timeout=None):
+        """ Skip each mic's leading samples so separately started streams begin at the same instant """
+        # 첫 ALIGN_SECONDS 가 들어올 때까지 대기 (시작 시각 추정 완료), {mic: 잘라낸 샘플 수} 또는 None
+        if not self._wait(self.engine.align_samples, timeout):
+            return None
+        reference = max(self.engine.start_time.values())
+        skipped = {mic: int(round((reference - t) * self.engine.rate)) for mic, t in self.engine.start_time.items()}
+        for mic, n in skipped.items():
+            self.positions[mic] += n
+        return skipped
+
+    def read_into(self, out, mics, timeout=None):
+        """ Fill a preallocated (len(mics), n) array in place, row i = mics[i]; False on timeout / end """
+        n = out.shape[1]
+        while True:
+            if not self._wait(n, timeout):
+                return False
+            # 소비자가 너무 느려 덮어쓴 구간은 건너뜀 -> 모든 마이크를 같은 샘플 수만큼 (마이크 간 정렬 유지)
+            skip = max(buf.oldest_pos() - self.positions[mic] for mic, buf in self.engine.buffers.items())
+            if skip > 0:
+                for mic in self.positions:
+                    self.positions[mic] += skip
+                    self.dropped[mic] += skip
+                continue
+            # 복사 중 덮어써졌으면 다시 (위에서 한꺼번에 건너뜀)
+            if all(self.engine.buffers[mic].read_into(self.positions[mic], row) for row, mic in zip(out, mics)):
+                break
+        for mic in self.positions:
+            self.positions[mic] += n
+        return True
@@ -0,0 +1,315 @@
+import argparse
+import json
+import math
+import os
+import socket
+import socketserver
+import threading
+import numpy as np
+
+"""
+- 실행 중 설정 변경: 마이크 위치 / onset 기준 / residual 기준 / 상관 품질 최소값 / 과녁 범위
+  프로세스를 끄지 않고 (캡처 / 녹음 / 장치는 그대로) 감지 pipeline 만 교체
+- 설정 파일 (JSON, 일부 키만 있어도 됨) 을 WATCH_INTERVAL 마다 확인, 바뀌면 다시 읽음
+- 로컬 제어 소켓 (Unix socket, 한 줄 JSON 요청 / 응답): get / set (검증 후 파일에도 저장) / reload
+- 검증 실패 시 기존 설정 유지 (오류는 제어 소켓 응답 / on_error 로 전달)
+- 새 pipeline (TDOA 격자 포함) 은 백그라운드 스레드에서 생성, 캡처 루프는 청크 사이에 swap() 으로 참조만 교체
+  (새 pipeline 이 드리프트 / onset 상태를 이어받음, 생성 중 또 바뀌면 마지막 설정만 적용)
+- 실행: python3 config.py get | set residual_threshold=0.004 x_limit=0,400 mic_positions.left=90,0 | reload
+"""
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "detect_config.json")
+CONTROL_SOCKET = "/tmp/mic_detect.sock"
+WATCH_INTERVAL = 1.0  # 초
+
+KEYS = ("mic_positions", "onset_ratio_db", "residual_threshold", "quality_min", "x_limit", "y_limit")
+
+
+def _number(key, value, lo=-math.inf, hi=math.inf):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"{key}: 숫자가 아닙니다 ({value!r})")
+    if not lo < value <= hi:
+        raise ValueError(f"{key}: 범위 ({lo}, {hi}] 밖입니다 ({value})")
+    return float(value)
+
+
+def _limit(key, value):
+    if not isinstance(value, (list, tuple)) or len(value) != 2:
+        raise ValueError(f"{key}: [최소, 최대] 형식이어야 합니다")
+    lo, hi = (_number(key, v) for v in value)
+    if lo >= hi:
+        raise ValueError(f"{key}: 최소 {lo} >= 최대 {hi}")
+    return [lo, hi]
+
+
+def validate(changes, current):
+    """ Merge changes into current settings; ValueError (설정은 그대로) if anything is invalid """
+    unknown = set(changes) - set(KEYS)
+    if unknown:
+        raise ValueError(f"알 수 없는 설정: {', '.join(sorted(unknown))}")
+    values = dict(current)
+    if "mic_positions" in changes:
+        positions = changes["mic_positions"]
+        if not isinstance(positions, dict):
+            raise ValueError("mic_positions: {마이크: [x, y]} 형식이어야 합니다")
+        unknown = set(positions) - set(current["mic_positions"])
+        if unknown:
+            # 마이크 구성 (장치 / 채널) 은 재시작해야 바뀜, 위치만 변경 가능
+            raise ValueError(f"mic_positions: 없는 마이크 {', '.join(sorted(unknown))}")
+        merged = {mic: list(pos) for mic, pos in current["mic_positions"].items()}
+        for mic, pos in positions.items():
+            if not isinstance(pos, (list, tuple)) or len(pos) != 2:
+                raise ValueError(f"mic_positions.{mic}: [x, y] 형식이어야 합니다")
+            merged[mic] = [_number(f"mic_positions.{mic}", v) for v in pos]
+        # 일직선 배치 (ver5 / ver6) 는 정상 구성, 같은 위치의 마이크만 거부 (시간차 0 -> 방향 정보 없음)
+        points = np.array(list(merged.values()))
+        gaps = np.linalg.norm(points[:, None] - points[None], axis=2)[np.triu_indices(len(points), 1)]
+        if (gaps < 1.0).any():
+            raise ValueError("mic_positions: 같은 위치에 마이크가 두 개 이상 있습니다")
+        values["mic_positions"] = merged
+    if "onset_ratio_db" in changes:
+        values["onset_ratio_db"] = _number("onset_ratio_db", changes["onset_ratio_db"], 0, 60)
+    if "residual_threshold" in changes:
+        values["residual_threshold"] = _number("residual_threshold", changes["residual_threshold"], 0)
+    if "quality_min" in changes:
+        values["quality_min"] = _number("quality_min", changes["quality_min"], -math.inf, 1)
+    for key in ("x_limit", "y_limit"):
+        if key in changes:
+            values[key] = _limit(key, changes[key])
+    return values
+
+
+def read_config(path):
+    with open(path) as f:
+        changes = json.load(f)
+    if not isinstance(changes, dict):
+        raise ValueError(f"{path}: JSON 객체가 아닙니다")
+    return changes
+
+
+def write_config(path, values):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(values, f, indent=2)
+    os.replace(tmp, path)
+
+
+class ConfigManager:
+    """ Watches a config file and a control socket, builds pipelines in the background, swap() hands them over """
+
+    def __init__(self, values, build, path=None, control=None, on_error=None):
+        # values: 현재 설정 dict (KEYS), build(values) -> 새 DetectionPipeline (백그라운드 스레드에서 호출)
+        self.values = values
+        self.build = build
+        self.path = path
+        self.control = control
+        self.on_error = on_error
+        self.generation = 0
+        self.applied = 0  # swap() 으로 적용된 generation
+        self._ready = None  # (generation, pipeline, values)
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._wanted = None  # (generation, values) 생성 대기
+        self._running = False
+        self._mtime = None
+        self._threads = []
+        self._server = None
+
+    def load(self):
+        """ Apply the config file once at startup (synchronously); returns the merged values """
+        if self.path and os.path.exists(self.path):
+            # 잘못된 파일이어도 watcher 가 같은 내용을 다시 보고하지 않도록 먼저 기록 (고치면 다시 읽음)
+            self._mtime = os.stat(self.path).st_mtime_ns
+            self.values = validate(read_config(self.path), self.values)
+        return self.values
+
+    def start(self):
+        # 제어 소켓을 먼저 열어 실패 (OSError) 시 아무 스레드도 시작하지 않음
+        if self.control:
+            self._server = _ControlServer(self.control, self)
+        self._running = True
+        self._threads = [threading.Thread(target=self._builder, daemon=True)]
+        if self.path:
+            self._threads.append(threading.Thread(target=self._watch, daemon=True))
+        if self._server is not None:
+            self._threads.append(threading.Thread(target=self._server.serve_forever, daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        with self._wake:
+            self._wake.notify_all()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            try:
+                os.unlink(self.control)
+            except OSError:
+                pass
+        for thread in self._threads:
+            thread.join()
+
+    def submit(self, changes, persist=False):
+        """ Validate + schedule a background rebuild; returns the new values (ValueError if invalid) """
+        with self._lock:
+            values = validate(changes, self._latest())
+            if persist and self.path:
+                write_config(self.path, values)
+                self._mtime = os.stat(self.path).st_mtime_ns  # 직접 쓴 변경은 watcher 가 다시 읽지 않음
+            self.generation += 1
+            self._wanted = (self.generation, values)
+            self._wake.notify_all()
+            return values
+
+    def reload(self):
+        if not self.path:
+            raise ValueError("설정 파일이 지정되지 않았습니다")
+        return self.submit(read_config(self.path))
+
+    def swap(self, pipeline):
+        """ Called between chunks by the capture loop: the newest ready pipeline (state adopted) or the old one """
+        with self._lock:
+            ready, self._ready = self._ready, None
+        if ready is None:
+            return pipeline
+        generation, new, values = ready
+        new.adopt(pipeline)
+        self.values = values
+        self.applied = generation
+        return new
+
+    def _latest(self):
+        # 생성 대기 > 생성 완료 (swap 전) > 적용 중 순서로 가장 최근 설정
+        if self._wanted is not None:
+            return self._wanted[1]
+        if self._ready is not None:
+            return self._ready[2]
+        return self.values
+
+    def pending(self):
+        with self._lock:
+            return self._wanted is not None or self._ready is not None
+
+    def _builder(self):
+        while True:
+            with self._wake:
+                while self._running and self._wanted is None:
+                    self._wake.wait()
+                if not self._running:
+                    return
+                generation, values = self._wanted
+            try:
+                pipeline = self.build(values)
+            except Exception as e:
+                self._error(f"pipeline 생성 실패: {e}")
+                pipeline = None
+            with self._lock:
+                if self._wanted is not None and self._wanted[0] == generation:
+                    self._wanted = None
+                # 생성 중 새 설정이 들어왔으면 이 결과는 버리고 다음 것을 만듦
+                if pipeline is not None and self._wanted is None:
+                    self._ready = (generation, pipeline, values)
+
+    def _watch(self):
+        while self._running:
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime is not None and mtime != self._mtime:
+                self._mtime = mtime
+                try:
+                    self.submit(read_config(self.path))
+                except (OSError, ValueError) as e:
+                    self._error(f"{self.path}: {e}")
+            with self._wake:
+                self._wake.wait(WATCH_INTERVAL)
+
+    def _error(self, text):
+        if self.on_error is not None:
+            self.on_error(text)
+
+
+class _ControlHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        manager = self.server.manager
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if "set" in request:
+                    values = manager.submit(request["set"], persist=True)
+                elif request.get("cmd") == "reload":
+                    values = manager.reload()
+                elif request.get("cmd") == "get":
+                    values = manager.values
+                else:
+                    raise ValueError(f"알 수 없는 요청: {request}")
+                # pending: 아직 캡처 루프에 적용되지 않음 (격자 생성 중)
+                reply = {"ok": True, "config": values, "pending": manager.pending()}
+            except (OSError, ValueError) as e:
+                reply = {"ok": False, "error": str(e)}
+            self.wfile.write((json.dumps(reply) + "\n").encode("utf-8"))
+
+
+class _ControlServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, manager):
+        self.manager = manager
+        if os.path.exists(path):
+            # 이전 실행이 남긴 소켓 파일 (연결되면 다른 프로세스가 사용 중)
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(path)
+                raise OSError(f"{path}: 다른 프로세스가 제어 소켓을 사용 중입니다")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(path)
+            finally:
+                probe.close()
+        super().__init__(path, _ControlHandler)
+
+
+def request(command, path=CONTROL_SOCKET):
+    """ Send one control request (dict) to a running detector and return its reply """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall((json.dumps(command) + "\n").encode("utf-8"))
+        return json.loads(sock.makefile().readline())
+
+
+def parse_assignments(items):
+    """ ["x_limit=0,400", "mic_positions.left=90,0"] -> {"x_limit": [0, 400], "mic_positions": {"left": [90, 0]}} """
+    changes = {}
+    for item in items:
+        key, _, text = item.partition("=")
+        try:
+            value = json.loads(text)
+        except ValueError:
+            value = json.loads(f"[{text}]")
+        target = changes
+        *parents, leaf = key.split(".")
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[leaf] = value
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=("get", "set", "reload"))
+    parser.add_argument("values", nargs="*", metavar="KEY=VALUE")
+    parser.add_argument("--socket", default=CONTROL_SOCKET)
+    args = parser.parse_args()
+
+    if args.command == "set":
+        reply = request({"set": parse_assignments(args.values)}, args.socket)
+    else:
+        reply = request({"cmd": args.command}, args.socket)
+    print(json.dumps(reply, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import sys
+
+from config import validate
+from detect_ver4 import config_values
+
+"""
+- 장비 없이 config.validate() 확인 (실행 중 설정 변경 시 받아들이는 / 거부하는 값)
+- ver5 / ver6 일직선 배치는 통과, 같은 위치의 마이크 / 범위 밖 값은 거부 (기존 설정 유지)
+- 실행: python3 config_test.py (pytest 로도 실행 가능)
+"""
+
+VER6_POSITIONS = {"left": [100, 0], "middle": [200, 0], "right": [300, 0]}
+
+
+def test_ver6_layout_passes():
+    values = validate({"mic_positions": VER6_POSITIONS}, config_values())
+    assert values["mic_positions"] == {mic: [float(x), float(y)] for mic, (x, y) in VER6_POSITIONS.items()}
+
+
+def test_duplicate_positions_rejected():
+    current = config_values()
+    try:
+        validate({"mic_positions": {"left": [200, 0], "middle": [200, 0]}}, current)
+    except ValueError:
+        return
+    raise AssertionError("같은 위치의 마이크가 통과됨")
+
+
+def test_invalid_value_keeps_current():
+    current = config_values()
+    for changes in ({"residual_threshold": -1}, {"x_limit": [400, 0]}, {"unknown": 1}):
+        try:
+            validate(changes, current)
+        except ValueError:
+            continue
+        raise AssertionError(f"잘못된 설정이 통과됨: {changes}")
+    assert current == config_values()
+
+
+def main():
+    ok = True
+    for name, test in sorted(globals().items()):
+        if name.startswith("test_"):
+            try:
+                test()
+                print(f"  {name}: ok")
+            except AssertionError as e:
+                print(f"  {name}: FAIL {e}")
+                ok = False
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import argparse
+import numpy as np
+from datetime import datetime
+import os
+
+from capture import CaptureEngine, WavReplayDevice
+from pipeline import DetectionPipeline, HIT, LOW_QUALITY
+from level_meter import LevelMeter
+from wav_writer import StreamingWavWriter
+from frames import FrameBuffer
+from drift import DriftTracker
+from event_log import EventLogger
+from event_store import EventStore
+from discovery import discover_devices, device_index
+from config import ConfigManager, CONFIG_FILE, CONTROL_SOCKET
+
+"""
+- detect_ver3 기반
+- stream.read() + time.sleep(0.1) 루프 제거 -> 콜백 기반 CaptureEngine 사용 (청크 사이 공백 없음)
+- 감지는 링 버퍼를 읽는 소비자(메인 스레드)에서 수행, 캡처는 멈추지 않음
+- --replay 옵션으로 WAV 파일을 마이크 대신 재생 (장비 없이 테스트)
+- find_peaks 첫 피크 시간 대신 GCC-PHAT 상호상관으로 시간차 계산 (샘플 이하 정밀도, 상관 품질 함께 출력)
+- scipy Nelder-Mead 대신 grid.py 격자 검색 + Gauss-Newton 보정 사용 (격자는 grid_cache/ 에 저장, 배치 변경 시 자동 재생성)
+- 고정 THRESHOLD_DB 대신 onset.py 적응형 잡음 바닥 + 5ms hop 단위 onset 감지
+- level_meter.py 로 캡처 스트림에서 마이크별 RMS/피크 dB 측정, 타격 시 함께 기록
+- recorded_data 메모리 누적 대신 wav_writer.py 로 녹음을 바로 파일에 저장 (강제 종료 시에도 보존, 1시간 단위 분할)
+- 감지 + 위치 추정은 pipeline.py 로 분리 (replay.py 와 같은 코드 사용)
+- 100ms 청크 전체 대신 onset 주변 구간만 위치 추정 (segmenter.py, 청크 경계에서 타격음이 나뉘지 않음)
+- 마이크별 dict 대신 (마이크 x 샘플) 배열 하나를 미리 할당해 매 청크 제자리에서 채움 (frames.py)
+- --combined: mic_setup.py --combined 로 만든 다채널 장치(mic_array) 하나로 모든 마이크를 한 스트림으로 캡처
+- drift.py 로 마이크(USB 카드)별 클럭 드리프트를 주변 소리로 계속 추정 / 보정 (장시간 실행 시에도 시간차 정확도 유지)
+- 로그: 호출마다 파일을 여는 log_message 대신 event_log.py (큐 + 백그라운드 JSON Lines 기록, 50MB 단위 분할)
+  타격 이벤트는 좌표 / residual / 신뢰도 / 마이크별 레벨을 레코드 하나로 기록
+- 모든 이벤트를 event_store.py 바이너리 파일(hits_*.bin)에도 기록 -> 기간 / 영역 검색, NumPy 로 바로 분석
+- 마이크 4개 이상 배열은 robust.py 로 이웃 쌍만 상관 계산 + RANSAC 조합 선택 (고장 난 마이크 자동 제외)
+- 마이크 위치 / 기준값은 실행 중 변경 가능 (config.py): detect_config.json 수정 또는 'python3 config.py set ...'
+  새 pipeline 은 백그라운드에서 만들고 청크 사이에 교체 -> 캡처 / 녹음은 멈추지 않음
+- MIC_IDENTIFIERS 를 채우면 재부팅마다 바뀌는 인덱스 대신 USB 포트 / 시리얼로 장치를 찾음 (discovery.py, 결과 캐시)
+"""
+
+os.environ["PYTHONWARNINGS"] = "ignore"
+os.environ["ALSA_CARD"] = "default"
+
+# 마이크별 장치 식별자 (python3 discovery.py 출력의 usb: / serial: 값), 비어 있으면 아래 MIC_DEVICES 인덱스 사용
+# 예: {"left": "usb:xhci-hcd.0-1.4", "middle": "usb:xhci-hcd.0-1.3", "right": "usb:xhci-hcd.0-1.2"}
+MIC_IDENTIFIERS = {}
+
+# 마이크별 pyaudio 장치 인덱스
+MIC_DEVICES = {
+    "left": 3,
+    "middle": 2,
+    "right": 1
+}
+
+# --combined 사용 시 다채널 장치 이름과 마이크별 채널 (mic_setup.py: 채널 0 = mic_1 = 우측)
+MIC_ARRAY_DEVICE = "mic_array"
+MIC_CHANNELS = {
+    "left": 2,
+    "middle": 1,
+    "right": 0
+}
+
+MIC_POSITIONS = {
+    "left": np.array([100, 0]),
+    "middle": np.array([200, 100]),
+    "right": np.array([300, 0])
+}
+
+RATE = 48000
+DURATION = 0.1  # 100ms
+CHUNK = int(RATE * DURATION)
+HOP = 1024  # 콜백 버퍼 크기
+ONSET_RATIO_DB = 12.0  # 마이크별 잡음 바닥 대비 onset 기준 (dB)
+RESIDUAL_THRESHOLD = 0.005
+SOUND_SPEED = 343000  # mm/s
+GCC_QUALITY_MIN = 0.1  # GCC-PHAT 상관 품질 최소값 (이보다 낮으면 시간차 신뢰 불가)
+RECT_X_LIMIT = (0, 400)  # mm
+RECT_Y_LIMIT = (0, 1000)  # mm
+
+current_time = datetime.now().strftime("%d_%m_%y_%H:%M:%S")
+LOG_FILENAME = f"sound_detection_{current_time}.jsonl"
+STORE_FILENAME = f"hits_{current_time}.bin"
+logger = None  # main() 에서 EventLogger 생성
+
+def log_message(msg):
+    if logger is not None:
+        logger.message(msg)
+
+def report(event, meter, store):
+    """ 파이프라인 이벤트 출력 + 로그 레코드 1개 (type "impact") + event store """
+    store.append(event)
+    record = dict(event)
+    record["stream_time"] = record.pop("time")  # 캡처 시작 기준 초
+    record["levels"] = {mic: [round(rms, 1), round(peak, 1)] for mic, (rms, peak, _) in meter.levels().items()}
+    logger.log("impact", **record)
+
+    if event["status"] == LOW_QUALITY:
+        print(f"상관 품질 낮음: {event['quality']:.2f}, 좌표 무시")
+    elif event["status"] == HIT:
+        print(f"타격음 좌표(추정) = (x={event['x']:.1f} mm, y={event['y']:.1f} mm)")
+        print(f"신뢰도 = {event['confidence']:.1f}%, 오차(Residual) = {event['residual']:.6f}, 상관 품질 = {event['quality']:.2f}")
+    else:
+        print(f"신뢰도 낮음: {event['confidence']:.1f}%, 좌표 무시")
+
+def config_values():
+    """ Module constants as config.py settings (JSON friendly) """
+    return {"mic_positions": {mic: [float(v) for v in pos] for mic, pos in MIC_POSITIONS.items()},
+            "onset_ratio_db": ONSET_RATIO_DB, "residual_threshold": RESIDUAL_THRESHOLD,
+            "quality_min": GCC_QUALITY_MIN, "x_limit": list(RECT_X_LIMIT), "y_limit": list(RECT_Y_LIMIT)}
+
+def build_pipeline(values, drift=None):
+    return DetectionPipeline(values["mic_positions"], RATE, SOUND_SPEED, values["onset_ratio_db"],
+                             values["residual_threshold"], values["quality_min"],
+                             tuple(values["x_limit"]), tuple(values["y_limit"]), drift=drift)
+
+def open_devices(replay_files, combined=False):
+    """ 실제 장치 인덱스 또는 WAV 재생 장치, --combined 면 (다채널 장치, 채널 매핑) """
+    if combined:
+        if not replay_files:
+            return device_index(MIC_ARRAY_DEVICE), MIC_CHANNELS
+        if len(replay_files) != 1:
+            raise SystemExit("--combined --replay 는 다채널 WAV 파일 1개 필요")
+        return WavReplayDevice(replay_files[0], hop=HOP, multichannel=True), MIC_CHANNELS
+    if not replay_files:
+        return (discover_devices(MIC_IDENTIFIERS) if MIC_IDENTIFIERS else MIC_DEVICES), None
+    if len(replay_files) != len(MIC_DEVICES):
+        raise SystemExit(f"--replay 파일 {len(MIC_DEVICES)}개 필요 (순서: {', '.join(MIC_DEVICES)})")
+    return {mic: WavReplayDevice(f, hop=HOP) for mic, f in zip(MIC_DEVICES, replay_files)}, None
+
+def main(argv=None, on_event=None):
+    # on_event: 이벤트마다 호출할 함수 (mic_server 의 HitBroadcaster.publish 등)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--replay", nargs="+", metavar="WAV",
+                        help="마이크 대신 재생할 WAV 파일 (MIC_DEVICES 순서, --combined 면 다채널 WAV 1개)")
+    parser.add_argument("--combined", action="store_true",
+                        help=f"마이크별 장치 대신 다채널 장치 {MIC_ARRAY_DEVICE} 하나로 캡처")
+    parser.add_argument("--config", default=CONFIG_FILE, help="실행 중 다시 읽는 설정 파일 (없으면 상수 사용)")
+    parser.add_argument("--control", default=CONTROL_SOCKET, help="제어 소켓 경로 ('' 이면 사용 안 함)")
+    args = parser.parse_args(argv)
+
+    global logger
+    logger = EventLogger(LOG_FILENAME)
+    print("Start monitoring... (Ctrl+C to stop)")
+    log_message("Monitoring started")
+
+    # 기준 마이크 = MIC_POSITIONS 첫 번째
+    drift = DriftTracker(len(MIC_POSITIONS), RATE)
+    config = ConfigManager(config_values(), build_pipeline, args.config, args.control, on_error=log_message)
+    try:
+        values = config.load()
+    except (OSError, ValueError) as e:
+        # 설정 파일이 잘못돼도 감지는 시작 (상수 사용, 파일을 고치면 watcher 가 다시 읽음)
+        log_message(f"{args.config}: {e} (기본 설정 사용)")
+        values = config.values
+    pipeline = build_pipeline(values, drift)
+    devices, channels = open_devices(args.replay, args.combined)
+    engine = CaptureEngine(devices, rate=RATE, hop=HOP, channels=channels)
+    reader = engine.reader()
+    meter = LevelMeter(MIC_DEVICES).attach(engine)
+    writers = {mic: StreamingWavWriter(f"{mic}_{current_time}.wav", RATE) for mic in MIC_DEVICES}
+    frame = FrameBuffer(pipeline.mics, CHUNK)
+    store = EventStore(STORE_FILENAME, pipeline.mics)
+
+    try:
+        config.start()
+    except OSError as e:
+        # 제어 소켓을 못 열어도 감지는 계속 (설정 파일 감시는 동작)
+        log_message(f"제어 소켓 사용 불가: {e}")
+        config.control = None
+        config.start()
+
+    try:
+        engine.start()
+        if not args.replay and not args.combined:
+            # 마이크별 장치는 시작 시각이 달라 일정한 어긋남이 남음 (drift.py 는 기울기만 보정)
+            skipped = reader.align()
+            if skipped is not None:
+                log_message(f"시작 시점 맞춤 (잘라낸 샘플): {skipped}")
+        while True:
+            if not frame.fill(reader):
+                # 재생 파일 끝
+                break
+
+            new = config.swap(pipeline)
+            if new is not pipeline:
+                pipeline = new
+                log_message(f"설정 적용: {config.values}")
+
+            for mic, samples in zip(frame.mics, frame.raw):
+                writers[mic].write(samples)
+
+            events = pipeline.process(frame.data)
+            if not events:
+                print("No impact detected.")
+            for event in events:
+                report(event, meter, store)
+                if on_event is not None:
+                    on_event(event)
+
+    except KeyboardInterrupt:
+        print("Monitoring stopped by user.")
+        log_message("Monitoring stopped by user.")
+
+    finally:
+        print("Monitoring ended.")
+        log_message("Monitoring ended.")
+        engine.stop()
+        config.stop()
+        log_message("클럭 드리프트(ppm) = " + ", ".join(f"{mic} {ppm:+.1f}" for mic, ppm in zip(pipeline.mics, drift.ppm())))
+        for mic, count in engine.overflows.items():
+            if count or reader.dropped[mic]:
+                log_message(f"{mic}: overflow {count}회, 누락 샘플 {reader.dropped[mic]}")
+        save_recordings(writers)
+        store.close()
+        print(f"[SAVED] {len(store)} events saved to {STORE_FILENAME}")
+        logger.close()
+        if logger.error is not None:
+            print(f"로그 기록 실패 ({logger.error}), {logger.dropped}개 레코드 누락")
+        elif logger.dropped:
+            print(f"로그 대기열 초과로 {logger.dropped}개 레코드 누락")
+
+def save_recordings(writers):
+    for mic, writer in writers.items():
+        writer.close()
+        for filename in writer.filenames:
+            print(f"[SAVED] {mic} mic saved as {filename}")
+        if writer.error is not None:
+            log_message(f"{mic}: 녹음 저장 실패 ({writer.error}), {writer.dropped_blocks}개 블록 누락")
+        elif writer.dropped_blocks:
+            log_message(f"{mic}: 저장 대기열 초과로 {writer.dropped_blocks}개 블록 누락")
+
+if __name__ == "__main__":
+    main()
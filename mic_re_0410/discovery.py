@@ -0,0 +1,213 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+
+"""
+- MIC_DEVICES 인덱스를 손으로 고치는 대신 USB 포트 / 시리얼 / ALSA 카드 id 로 마이크 장치를 찾음
+- 카드 목록은 /proc/asound, /sys/class/sound 에서 바로 읽음 (PortAudio 장치 조회 없음, 수 ms)
+  arecord -l 정규식 파싱 (mic_setup.get_mic_indices) 도 이 목록으로 대체
+- 식별자: "usb:<포트 경로>" (같은 포트에 꽂으면 재부팅 후에도 같음), "serial:<USB 시리얼>", "card:<ALSA id>"
+- 찾은 결과 (마이크 -> PortAudio 인덱스) 를 카드 구성 fingerprint 와 함께 device_cache.json 에 저장
+  -> 같은 구성으로 재시작하면 PortAudio 장치 목록을 훑지 않고 바로 캡처 시작 (카드 순서가 바뀌면 그 구성도 따로 저장)
+- 실행: python3 discovery.py  (카드별 식별자 출력 -> detect_ver4.MIC_IDENTIFIERS 에 입력) [--refresh]
+"""
+
+PROC_ASOUND = "/proc/asound"
+SYS_SOUND = "/sys/class/sound"
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "device_cache.json")
+CACHE_ENTRIES = 16  # 보관할 카드 구성 수
+ASOUND_CONFIGS = (os.path.expanduser("~/.asoundrc"), "/etc/asound.conf")  # PCM 별칭 정의 파일
+
+CARD_LINE = re.compile(r"^\s*(\d+) \[(\S+)\s*\]: (\S+) - (.*)$")
+USB_PATH = re.compile(r" at usb-(\S+?),")
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def list_cards(proc=PROC_ASOUND, sys_sound=SYS_SOUND):
+    """ Sound cards as dicts: card, id, driver, name, usb_path, usb_id, serial, capture """
+    text = _read(os.path.join(proc, "cards")) or ""
+    lines = text.splitlines()
+    cards = []
+    for i, line in enumerate(lines):
+        match = CARD_LINE.match(line)
+        if not match:
+            continue
+        card = int(match.group(1))
+        longname = lines[i + 1].strip() if i + 1 < len(lines) else ""
+        usb = USB_PATH.search(longname + ",")
+        card_dir = os.path.join(proc, f"card{card}")
+        serial = None
+        device = os.path.realpath(os.path.join(sys_sound, f"card{card}", "device"))
+        if os.path.isdir(device):
+            # 카드 장치는 USB 인터페이스 (1-1.2:1.0), 시리얼은 그 위 USB 장치 (1-1.2) 에 있음
+            serial = _read(os.path.join(os.path.dirname(device), "serial"))
+        cards.append({
+            "card": card,
+            "id": match.group(2),
+            "driver": match.group(3),
+            "name": match.group(4).strip(),
+            "usb_path": usb.group(1) if usb else None,
+            "usb_id": _read(os.path.join(card_dir, "usbid")),
+            "serial": serial,
+            "capture": any(name.startswith("pcm") and name.endswith("c") for name in _listdir(card_dir)),
+        })
+    return cards
+
+
+def _listdir(path):
+    try:
+        return os.listdir(path)
+    except OSError:
+        return []
+
+
+def identifiers(card):
+    """ Every identifier string a MIC_IDENTIFIERS entry may use for this card """
+    result = []
+    if card["usb_path"]:
+        result.append(f"usb:{card['usb_path']}")
+    if card["serial"]:
+        result.append(f"serial:{card['serial']}")
+    result.append(f"card:{card['id']}")
+    return result
+
+
+def resolve(mic_identifiers, cards):
+    """ {"left": "usb:...", ...} -> {"left": card dict}; ValueError if missing or ambiguous """
+    resolved = {}
+    for mic, ident in mic_identifiers.items():
+        matches = [card for card in cards if card["capture"] and ident in identifiers(card)]
+        if not matches:
+            raise ValueError(f"{mic}: '{ident}' 장치를 찾지 못했습니다 (python3 discovery.py 로 확인)")
+        if len(matches) > 1:
+            raise ValueError(f"{mic}: '{ident}' 에 맞는 장치가 {len(matches)}개 (usb: 또는 serial: 사용)")
+        resolved[mic] = matches[0]
+    return resolved
+
+
+def fingerprint(cards, patterns, backend):
+    """ Hash of the card layout, the requested devices and the ALSA config files (PortAudio 인덱스가 바뀌는 조건) """
+    configs = []
+    for path in ASOUND_CONFIGS:
+        try:
+            stat = os.stat(path)
+            configs.append([stat.st_size, stat.st_mtime_ns])
+        except OSError:
+            configs.append(None)
+    layout = [[c["card"], c["id"], c["usb_path"], c["serial"], c["capture"]] for c in cards]
+    data = json.dumps([layout, sorted(patterns.items()), backend, configs])
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def _portaudio_indices(patterns, backend):
+    """ One PortAudio enumeration: {key: index of the first input device whose name contains pattern} """
+    if backend == "sounddevice":
+        import sounddevice as sd
+
+        devices = [(i, d["name"], d["max_input_channels"]) for i, d in enumerate(sd.query_devices())]
+    else:
+        import pyaudio
+
+        pa = pyaudio.PyAudio()
+        try:
+            devices = [(i, info["name"], info["maxInputChannels"])
+                       for i, info in ((i, pa.get_device_info_by_index(i)) for i in range(pa.get_device_count()))]
+        finally:
+            pa.terminate()
+
+    indices = {}
+    for key, pattern in patterns.items():
+        found = [i for i, name, inputs in devices if pattern in name and inputs > 0]
+        if not found:
+            raise ValueError(f"{key}: PortAudio 입력 장치 '{pattern}' 없음")
+        indices[key] = found[0]
+    return indices
+
+
+def _load_cache(cache_file):
+    try:
+        with open(cache_file) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache_file, cache):
+    # 오래된 구성부터 정리
+    entries = sorted(cache.items(), key=lambda item: item[1]["used"], reverse=True)[:CACHE_ENTRIES]
+    tmp = cache_file + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(dict(entries), f, indent=1)
+    os.replace(tmp, cache_file)
+
+
+def cached_indices(patterns, cards, backend="pyaudio", cache_file=CACHE_FILE, refresh=False):
+    """ {key: PortAudio name pattern} -> ({key: index}, cache hit) """
+    key = fingerprint(cards, patterns, backend)
+    cache = _load_cache(cache_file)
+    entry = cache.get(key)
+    hit = entry is not None and not refresh
+    if hit:
+        indices = entry["indices"]
+    else:
+        indices = _portaudio_indices(patterns, backend)
+    cache[key] = {"indices": indices, "used": time.time()}
+    try:
+        _save_cache(cache_file, cache)
+    except OSError:
+        pass  # 읽기 전용이어도 캡처는 진행
+    return indices, hit
+
+
+def discover_devices(mic_identifiers, backend="pyaudio", cache_file=CACHE_FILE, refresh=False, cards=None):
+    """ {"left": "usb:...", ...} -> {"left": PortAudio index, ...} for CaptureEngine """
+    cards = list_cards() if cards is None else cards
+    resolved = resolve(mic_identifiers, cards)
+    patterns = {mic: f"(hw:{card['card']},0)" for mic, card in resolved.items()}
+    return cached_indices(patterns, cards, backend, cache_file, refresh)[0]
+
+
+def device_index(name, backend="pyaudio", cache_file=CACHE_FILE, refresh=False, cards=None):
+    """ PortAudio index of a named PCM (e.g. "mic_array"), cached like discover_devices() """
+    cards = list_cards() if cards is None else cards
+    return cached_indices({name: name}, cards, backend, cache_file, refresh)[0][name]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--refresh", action="store_true", help="캐시 무시하고 PortAudio 장치 목록 다시 조회")
+    parser.add_argument("--backend", default="pyaudio", choices=("pyaudio", "sounddevice"))
+    args = parser.parse_args()
+
+    cards = list_cards()
+    print("=== Capture cards ===")
+    for card in cards:
+        if card["capture"]:
+            print(f"{card['card']}: {card['name']}  ->  {', '.join(identifiers(card))}")
+
+    import detect_ver4
+
+    if not detect_ver4.MIC_IDENTIFIERS:
+        print("detect_ver4.MIC_IDENTIFIERS 가 비어 있음 (위 usb: 식별자를 마이크 위치별로 입력)")
+        return
+    start = time.perf_counter()
+    resolved = resolve(detect_ver4.MIC_IDENTIFIERS, cards)
+    patterns = {mic: f"(hw:{card['card']},0)" for mic, card in resolved.items()}
+    indices, hit = cached_indices(patterns, cards, args.backend, refresh=args.refresh)
+    print(f"=== MIC_IDENTIFIERS ({'cache' if hit else 'PortAudio'}, {(time.perf_counter() - start) * 1e3:.1f} ms) ===")
+    for mic, index in indices.items():
+        print(f"{mic}: card {resolved[mic]['card']} -> index {index}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import numpy as np
+
+from tdoa import gcc_phat
+
+"""
+- USB 카드마다 수정 발진자(clock)가 달라 시간이 지나면 마이크 간 샘플 위치가 어긋남 (20 ppm -> 1200초에 24ms)
+- 기준 마이크 대비 마이크별 시간차를 주기적으로 측정 (주변 소리 / 박수 보정음 1초 구간 GCC-PHAT)
+- 타격음 같은 순간음이 들어간 구간은 측정하지 않음 (음원 위치마다 시간차가 달라 기울기를 흔듦) -> 다음 청크에서 재시도
+- 측정값 이력에 품질 가중 직선 맞춤 -> 기울기 = 클럭 오차 (ppm)
+  (주변 소리 위치에 따른 시간차는 시간에 따라 쌓이지 않으므로 절편으로 흡수, 기울기만 보정)
+- 보정 1: 정수 샘플은 마이크별 지연선(delay line)으로 입력 자체를 맞춤 (onset / 구간 자르기도 맞춰짐)
+- 보정 2: 남은 샘플 이하 오차는 residual() 로 시간차(TDOA)에서 빼줌 (재샘플링 없이 정확)
+"""
+
+WINDOW_SECONDS = 1.0       # 측정 구간 길이
+INTERVAL_SECONDS = 10.0    # 측정 주기
+HISTORY = 60               # 직선 맞춤에 쓰는 최근 측정 수 (10초 x 60 = 10분)
+QUALITY_MIN = 0.05         # 이보다 낮은 상관은 버림 (주변 소리가 너무 조용할 때)
+SEARCH_SECONDS = 0.002     # 맞춘 뒤 남은 어긋남 검색 범위 (마이크 간 최대 지연 + 여유)
+ACQUIRE_SECONDS = 0.05     # 기울기를 얻기 전 (시작 직후) 검색 범위
+MAX_SHIFT_SECONDS = 0.5    # 지연선 최대 길이
+MIN_ESTIMATES = 2          # 기울기 계산에 필요한 최소 측정 수
+OUTLIER_MAD = 3.0          # 직선에서 MAD 의 이 배수 이상 벗어나면 제외
+TRANSIENT_DB = 10.0        # 10ms 블록 에너지가 중앙값보다 이만큼 크면 순간음으로 봄
+BLOCK_SECONDS = 0.01
+
+
+class DriftTracker:
+    """ Estimates each mic's clock drift against a reference mic and realigns the streams """
+
+    def __init__(self, num_mics, rate, reference=0, window_seconds=WINDOW_SECONDS,
+                 interval_seconds=INTERVAL_SECONDS, history=HISTORY, quality_min=QUALITY_MIN,
+                 search_seconds=SEARCH_SECONDS, acquire_seconds=ACQUIRE_SECONDS,
+                 max_shift_seconds=MAX_SHIFT_SECONDS):
+        self.num_mics = num_mics
+        self.rate = rate
+        self.reference = reference
+        self.window = int(window_seconds * rate)
+        self.interval = int(interval_seconds * rate)
+        self.history = history
+        self.quality_min = quality_min
+        self.search = search_seconds
+        self.acquire = acquire_seconds
+        self.max_shift = int(max_shift_seconds * rate)
+
+        others = [m for m in range(num_mics) if m != reference]
+        self.pairs = np.array([[reference, m] for m in others], dtype=np.int64).reshape(-1, 2)
+
+        self.position = 0                                    # 입력 누적 샘플 수 (기준 마이크 시간)
+        self.slope = np.zeros(num_mics)                      # 초당 어긋남 (초/초 = ppm * 1e-6)
+        self.locked = np.zeros(num_mics, dtype=bool)         # 기울기 추정 완료 여부
+        self.locked[reference] = True
+        self.shifts = np.zeros(num_mics, dtype=np.int64)     # 현재 적용 중인 정수 보정 (샘플)
+        self.delays = np.zeros(num_mics, dtype=np.int64)     # 지연선 길이 (샘플), 출력은 이만큼 늦음
+        self.estimates = []                                  # (t, raw offsets (M,), quality (M,))
+
+        # 측정용 최근 구간 (원형 버퍼) + 지연선 (직전 입력 꼬리)
+        self._recent = np.zeros((num_mics, self.window), dtype=np.float32)
+        self._tail = np.zeros((num_mics, self.max_shift), dtype=np.float32)
+        self._next_estimate = self.interval
+
+    def ppm(self):
+        """ Estimated clock error of every mic relative to the reference (parts per million) """
+        return self.slope * 1e6
+
+    def drift(self, t=None):
+        """ (M,) predicted delay of each mic relative to the reference at time t (seconds) """
+        t = self.position / self.rate if t is None else t
+        return self.slope * t
+
+    def residual(self):
+        """ (M,) sub-sample delay left after the integer shift; subtract from arrival times """
+        return self.drift() - self.shifts / self.rate
+
+    def latency(self):
+        """ Seconds by which the aligned output lags the reference input (subtract from event times) """
+        return self.delays[self.reference] / self.rate
+
+    def process(self, signals):
+        """
+        signals: (M, n) float32 원래 스트림 -> 정수 샘플 보정된 (M, n) 배열
+        주기마다 드리프트 측정 / 갱신
+        """
+        signals = np.asarray(signals, dtype=np.float32)
+        n = signals.shape[1]
+        aligned = self._align(signals)
+        self._remember(aligned)
+        self.position += n
+
+        if self.position >= self._next_estimate and self.position >= self.window:
+            if self._estimate():
+                self._next_estimate = self.position + self.interval
+        return aligned
+
+    def _align(self, signals):
+        # 늦게 도착하는 마이크(drift > 0)는 앞당길 수 없으므로 나머지를 그만큼 늦춤
+        target = np.round(self.drift() * self.rate).astype(np.int64)
+        target = np.clip(target, -self.max_shift // 2, self.max_shift // 2)
+        self.shifts = target
+        self.delays = target.max() - target
+
+        n = signals.shape[1]
+        out = np.empty_like(signals)
+        for m in range(self.num_mics):
+            d = int(self.delays[m])
+            if d == 0:
+                out[m] = signals[m]
+            elif d >= n:
+                out[m] = self._tail[m, self.max_shift - d:self.max_shift - d + n]
+            else:
+                out[m, :d] = self._tail[m, self.max_shift - d:]
+                out[m, d:] = signals[m, :n - d]
+
+        # 지연선 꼬리 갱신
+        if n >= self.max_shift:
+            self._tail[:] = signals[:, n - self.max_shift:]
+        else:
+            self._tail[:, :-n] = self._tail[:, n:]
+            self._tail[:, -n:] = signals
+        return out
+
+    def _remember(self, aligned):
+        n = aligned.shape[1]
+        if n >= self.window:
+            self._recent[:] = aligned[:, n - self.window:]
+            return
+        index = self.position % self.window
+        end = index + n
+        if end <= self.window:
+            self._recent[:, index:end] = aligned
+        else:
+            split = self.window - index
+            self._recent[:, index:] = aligned[:, :split]
+            self._recent[:, :end - self.window] = aligned[:, split:]
+
+    def _estimate(self):
+        """ Measure the remaining offset on the aligned streams and refit the drift line; False if skipped """
+        # 원형 버퍼를 시간 순서로
+        index = self.position % self.window
+        recent = np.roll(self._recent, -index, axis=1)
+        if self._has_transient(recent):
+            return False
+        search = self.search if self.locked.all() else self.acquire
+        delays, quality, _ = gcc_phat(recent, self.rate, search, pairs=self.pairs)
+
+        # 적용 중이던 보정을 더해 원래 스트림 기준 어긋남으로 환산
+        raw = np.zeros(self.num_mics)
+        qual = np.zeros(self.num_mics)
+        others = self.pairs[:, 1]
+        raw[others] = delays + self.shifts[others] / self.rate - self.shifts[self.reference] / self.rate
+        qual[others] = quality
+        t = (self.position - self.window / 2) / self.rate
+        self.estimates.append((t, raw, qual))
+        del self.estimates[:-self.history]
+        self._fit()
+        return True
+
+    def _has_transient(self, recent):
+        block = int(BLOCK_SECONDS * self.rate)
+        usable = recent.shape[1] - recent.shape[1] % block
+        energy = (recent[:, :usable].reshape(self.num_mics, -1, block) ** 2).mean(axis=2)
+        floor = np.median(energy, axis=1) + 1e-20
+        return bool((energy.max(axis=1) > floor * 10 ** (TRANSIENT_DB / 10)).any())
+
+    def _fit(self):
+        if len(self.estimates) < MIN_ESTIMATES:
+            return
+        t = np.array([e[0] for e in self.estimates])
+        raw = np.stack([e[1] for e in self.estimates])
+        qual = np.stack([e[2] for e in self.estimates])
+
+        for m in self.pairs[:, 1]:
+            keep = qual[:, m] >= self.quality_min
+            for _ in range(2):
+                if keep.sum() < MIN_ESTIMATES or np.ptp(t[keep]) == 0:
+                    break
+                w = qual[keep, m]
+                a = np.stack([np.ones(keep.sum()), t[keep]], axis=1) * np.sqrt(w)[:, None]
+                intercept, slope = np.linalg.lstsq(a, raw[keep, m] * np.sqrt(w), rcond=None)[0]
+                self.slope[m] = slope
+                self.locked[m] = True
+                # 직선에서 크게 벗어난 측정 (반향, 다른 음원) 제외 후 한 번 더
+                error = np.abs(raw[:, m] - (intercept + slope * t))
+                mad = np.median(error[keep]) + 1.0 / self.rate
+                keep = keep & (error <= OUTLIER_MAD * mad)
@@ -0,0 +1,156 @@
+import json
+import os
+import queue
+import threading
+import time
+
+"""
+- log_message (호출마다 파일 열기 / 닫기 + strftime) 대신 구조화된 이벤트 로그
+- 감지 스레드는 dict 를 큐에 넣기만 함 (디스크 I/O 로 멈추지 않음, 큐가 가득 차면 버리고 개수만 셈)
+- 백그라운드 스레드가 모아서 한 번에 JSON Lines 로 기록, 파일 핸들은 계속 열어 둠
+- 크기 기준 파일 분할 (name.jsonl, name_001.jsonl, name_002.jsonl ...)
+- read_log() 로 분할된 파일을 순서대로 다시 읽음
+"""
+
+MAX_BYTES = 50 * 1024 * 1024   # 파일 하나 최대 크기 (byte), None 이면 분할 안 함
+FLUSH_INTERVAL = 1.0           # 디스크 flush 주기 (초)
+QUEUE_SIZE = 10000             # 대기 레코드 수
+BATCH = 256                    # 한 번에 기록하는 최대 레코드 수
+
+
+def _to_json(value):
+    """ json.dumps fallback for numpy scalars / arrays """
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+
+class EventLogger:
+    """ Queue-fed JSON Lines writer thread with size-based rotation; log() never touches the disk """
+
+    def __init__(self, filename, max_bytes=MAX_BYTES, flush_interval=FLUSH_INTERVAL, queue_size=QUEUE_SIZE):
+        self.base, ext = os.path.splitext(filename)
+        self.ext = ext or ".jsonl"
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+
+        self.filenames = []
+        self.records_written = 0
+        self.dropped = 0
+        self.error = None  # 기록 스레드가 죽은 원인 (디스크 가득 참 등)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._file = None
+        self._file_bytes = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def log(self, kind, **fields):
+        """ Queue one record {"t": epoch seconds, "type": kind, **fields}; drops it if the queue is full """
+        fields["t"] = time.time()
+        fields["type"] = kind
+        if not self._thread.is_alive():
+            self.dropped += 1
+            return
+        try:
+            self._queue.put_nowait(fields)
+        except queue.Full:
+            self.dropped += 1
+
+    def message(self, text):
+        """ Free-text line, replacement for the old log_message() """
+        self.log("message", text=text)
+
+    def close(self):
+        """ Flush and stop the writer thread; does not hang if it already died (see error) """
+        while self._thread.is_alive():
+            try:
+                self._queue.put(None, timeout=0.5)
+                break
+            except queue.Full:
+                pass  # 살아 있으면 계속 대기, 죽었으면 루프 종료
+        self._thread.join()
+        if self.error is not None:
+            # 남은 레코드도 누락으로 셈 (종료 표시 None 제외)
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                self.dropped += item is not None
+
+    def _next_filename(self):
+        index = len(self.filenames)
+        return f"{self.base}{self.ext}" if index == 0 else f"{self.base}_{index:03d}{self.ext}"
+
+    def _open(self):
+        filename = self._next_filename()
+        self.filenames.append(filename)
+        self._file = open(filename, "a", encoding="utf-8")
+        self._file_bytes = 0
+
+    def _write(self, records):
+        lines = "".join(json.dumps(r, ensure_ascii=False, separators=(",", ":"), default=_to_json) + "\n"
+                        for r in records)
+        if self._file is None:
+            self._open()
+        self._file.write(lines)
+        self._file_bytes += len(lines.encode("utf-8"))
+        self.records_written += len(records)
+        if self.max_bytes and self._file_bytes >= self.max_bytes:
+            self._file.close()
+            self._file = None
+
+    def _run(self):
+        last_flush = time.monotonic()
+        done = False
+        records = []
+        try:
+            while not done:
+                try:
+                    record = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    record = False
+                records = []
+                if record is None:
+                    done = True
+                elif record is not False:
+                    records.append(record)
+                    # 이미 쌓인 레코드를 한 번에 기록
+                    while len(records) < BATCH:
+                        try:
+                            record = self._queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        if record is None:
+                            done = True
+                            break
+                        records.append(record)
+                if records:
+                    self._write(records)
+                if self._file is not None and (done or time.monotonic() - last_flush >= self.flush_interval):
+                    self._file.flush()
+                    last_flush = time.monotonic()
+        except Exception as e:
+            self.error = e
+            self.dropped += len(records)  # 기록 중 실패한 묶음
+        finally:
+            if self._file is not None:
+                try:
+                    self._file.close()
+                except OSError as e:
+                    self.error = self.error or e
+                self._file = None
+
+
+def read_log(filename):
+    """ Yield records from filename and its rotated parts (name_001.jsonl ...) in order """
+    base, ext = os.path.splitext(filename)
+    index = 0
+    path = filename
+    while os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        index += 1
+        path = f"{base}_{index:03d}{ext}"
@@ -0,0 +1,190 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+
+from pipeline import HIT, LOW_QUALITY, LOW_CONFIDENCE
+
+"""
+- 타격 기록용 추가 전용(append-only) 바이너리 파일 (고정 크기 레코드, NumPy structured dtype)
+- 텍스트 로그를 정규식으로 파싱하지 않고 np.memmap 으로 바로 읽음 (히트맵 / 시간대별 개수 분석)
+- 희소 시간 인덱스: INDEX_STRIDE 레코드마다 시간 1개만 메모리에 보관 -> 구간 검색 시 필요한 블록만 읽음
+- 구간 검색: between(t0, t1), 영역 검색: in_region(x_limit, y_limit, t0, t1), 전체: array() (memmap)
+- 실행: python3 event_store.py hits_X.bin [--hourly] [--export out.npy]
+"""
+
+MAGIC = b"HITSTORE"
+VERSION = 1
+HEADER_SIZE = 512          # magic + version + record size + JSON (마이크 이름), 0 으로 채움
+INDEX_STRIDE = 1024        # 희소 인덱스 간격 (레코드 수)
+BUFFER_RECORDS = 256       # 이만큼 모이면 파일에 기록
+
+RECORD = np.dtype([
+    ("t", "<f8"),             # epoch 초
+    ("stream_time", "<f8"),   # 캡처 시작 기준 초
+    ("x", "<f4"),             # mm (좌표 없으면 NaN)
+    ("y", "<f4"),
+    ("residual", "<f4"),
+    ("confidence", "<f4"),
+    ("quality", "<f4"),
+    ("status", "u1"),         # STATUS_CODES
+    ("mic_mask", "<u2"),      # onset 마이크 비트 (헤더 mics 순서)
+])
+
+STATUS_CODES = {HIT: 0, LOW_QUALITY: 1, LOW_CONFIDENCE: 2}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+
+
+def _header(mics):
+    meta = json.dumps({"mics": list(mics)}).encode("utf-8")
+    head = MAGIC + np.array([VERSION, RECORD.itemsize, len(meta)], dtype="<u4").tobytes() + meta
+    if len(head) > HEADER_SIZE:
+        raise ValueError("마이크 이름이 너무 깁니다")
+    return head.ljust(HEADER_SIZE, b"\0")
+
+
+def _read_header(f):
+    head = f.read(HEADER_SIZE)
+    if len(head) < HEADER_SIZE or not head.startswith(MAGIC):
+        raise ValueError(f"{f.name}: event store 파일이 아닙니다")
+    version, itemsize, meta_len = np.frombuffer(head[len(MAGIC):len(MAGIC) + 12], dtype="<u4")
+    if version != VERSION or itemsize != RECORD.itemsize:
+        raise ValueError(f"{f.name}: 지원하지 않는 버전 {version} (레코드 {itemsize} byte)")
+    meta = json.loads(head[len(MAGIC) + 12:len(MAGIC) + 12 + meta_len])
+    return meta["mics"]
+
+
+class EventStore:
+    """ Append-only fixed-record event file with a sparse time index and memory-mapped queries """
+
+    def __init__(self, filename, mics=None, readonly=False):
+        # 새 파일이면 mics (이름 목록) 필요, 기존 파일이면 헤더의 mics 사용
+        self.filename = filename
+        self.readonly = readonly
+        if os.path.exists(filename) and os.path.getsize(filename) > 0:
+            with open(filename, "rb") as f:
+                self.mics = _read_header(f)
+            if mics is not None and list(mics) != self.mics:
+                raise ValueError(f"{filename}: 마이크 구성이 다릅니다 ({self.mics})")
+        elif readonly:
+            raise FileNotFoundError(filename)
+        else:
+            self.mics = list(mics)
+            with open(filename, "wb") as f:
+                f.write(_header(self.mics))
+
+        if len(self.mics) > 16:
+            raise ValueError("mic_mask 는 마이크 16개까지 지원합니다")
+
+        self._file = None if readonly else open(filename, "ab")
+        self._buffer = np.zeros(BUFFER_RECORDS, dtype=RECORD)
+        self._buffered = 0
+        self._map = None
+        self._index = np.zeros(0)
+        self._indexed = 0  # 인덱스가 반영한 레코드 수
+
+    def __len__(self):
+        return (os.path.getsize(self.filename) - HEADER_SIZE) // RECORD.itemsize + self._buffered
+
+    def append(self, event, t=None):
+        """ Buffer one pipeline event dict (written every BUFFER_RECORDS events or on flush) """
+        rec = self._buffer[self._buffered]
+        rec["t"] = time.time() if t is None else t
+        rec["stream_time"] = event.get("time", event.get("stream_time", np.nan))
+        for key in ("x", "y", "residual", "confidence", "quality"):
+            rec[key] = event.get(key, np.nan)
+        rec["status"] = STATUS_CODES[event["status"]]
+        mask = 0
+        for mic in event.get("mics", ()):
+            mask |= 1 << self.mics.index(mic)
+        rec["mic_mask"] = mask
+        self._buffered += 1
+        if self._buffered == BUFFER_RECORDS:
+            self.flush()
+
+    def flush(self):
+        if self._buffered and self._file is not None:
+            self._file.write(self._buffer[:self._buffered].tobytes())
+            self._file.flush()
+        self._buffered = 0
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._map = None
+
+    def array(self):
+        """ Read-only memmap of every flushed record (no copy) """
+        count = (os.path.getsize(self.filename) - HEADER_SIZE) // RECORD.itemsize
+        if self._map is None or len(self._map) != count:
+            self._map = np.memmap(self.filename, dtype=RECORD, mode="r", offset=HEADER_SIZE, shape=(count,)) \
+                if count else np.zeros(0, dtype=RECORD)
+            self._update_index()
+        return self._map
+
+    def _update_index(self):
+        # 새로 추가된 부분만 INDEX_STRIDE 간격으로 읽어 인덱스 확장
+        start = -(-self._indexed // INDEX_STRIDE) * INDEX_STRIDE
+        if start < len(self._map):
+            self._index = np.concatenate((self._index, np.array(self._map["t"][start::INDEX_STRIDE])))
+        self._indexed = len(self._map)
+
+    def _locate(self, data, t):
+        """ First record position with time >= t, touching only one INDEX_STRIDE block """
+        block = max(int(np.searchsorted(self._index, t, side="left")) - 1, 0)
+        lo = block * INDEX_STRIDE
+        hi = min(lo + 2 * INDEX_STRIDE, len(data))
+        return lo + int(np.searchsorted(np.array(data["t"][lo:hi]), t, side="left"))
+
+    def between(self, t0=None, t1=None):
+        """ Records with t0 <= t < t1 (epoch seconds) as a memmap slice """
+        data = self.array()
+        lo = 0 if t0 is None else self._locate(data, t0)
+        hi = len(data) if t1 is None else self._locate(data, t1)
+        return data[lo:max(lo, hi)]
+
+    def in_region(self, x_limit, y_limit, t0=None, t1=None, status=HIT):
+        """ Records inside x_limit / y_limit (mm) within [t0, t1), by default hits only """
+        data = self.between(t0, t1)
+        keep = (data["x"] >= x_limit[0]) & (data["x"] <= x_limit[1]) & \
+               (data["y"] >= y_limit[0]) & (data["y"] <= y_limit[1])
+        if status is not None:
+            keep &= data["status"] == STATUS_CODES[status]
+        return data[keep]
+
+    def mics_of(self, mask):
+        """ Decode a mic_mask back to mic names """
+        return [mic for i, mic in enumerate(self.mics) if int(mask) >> i & 1]
+
+
+def hourly_counts(records):
+    """ {"YYYY-mm-dd HH": count} for a record array """
+    hours = (records["t"] // 3600).astype(np.int64)
+    values, counts = np.unique(hours, return_counts=True)
+    return {time.strftime("%Y-%m-%d %H", time.localtime(h * 3600)): int(c) for h, c in zip(values, counts)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("filename")
+    parser.add_argument("--hourly", action="store_true", help="시간대별 타격 수 출력")
+    parser.add_argument("--export", help="전체 레코드를 .npy 로 저장")
+    args = parser.parse_args()
+
+    store = EventStore(args.filename, readonly=True)
+    data = store.array()
+    hits = data[data["status"] == STATUS_CODES[HIT]]
+    print(f"{args.filename}: {len(data)} events, {len(hits)} hits, mics {store.mics}")
+    if args.hourly:
+        for hour, count in hourly_counts(hits).items():
+            print(f"  {hour}  {count}")
+    if args.export:
+        np.save(args.export, data)
+        print(f"Exported to {args.export}")
+
+
+if __name__ == "__main__":
+    main()
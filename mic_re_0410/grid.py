@@ -0,0 +1,134 @@
+import hashlib
+import os
+import tempfile
+import numpy as np
+
+import solver
+from tdoa import mic_pairs
+
+"""
+- 타격 영역(RECT_X_LIMIT x RECT_Y_LIMIT)의 격자별 예상 쌍별 시간차(TDOA) 미리 계산
+- float32 배열로 보관, .npy 로 저장 후 다음 실행 시 memory-map 으로 로드
+- 파일 이름에 마이크 배치 지문(fingerprint) 포함 -> 배치가 바뀌면 자동 재생성
+- 위치 추정 = 최근접 격자 검색 + Gauss-Newton 몇 번으로 보정 (반복 최적화 없음)
+"""
+
+GRID_STEP = 2  # mm
+GRID_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "grid_cache")
+LOOKUP_BATCH = 256  # 이벤트 여러 개 검색 시 한 번에 처리할 개수 (메모리 제한)
+
+
+def fingerprint(mic_positions, sound_speed, x_limit, y_limit, step):
+    """ Hash of everything the grid depends on """
+    h = hashlib.sha1()
+    h.update(np.asarray(mic_positions, dtype=np.float64).tobytes())
+    h.update(np.array([sound_speed, *x_limit, *y_limit, step], dtype=np.float64).tobytes())
+    return h.hexdigest()[:16]
+
+
+class TdoaGrid:
+    """ Expected pairwise TDOAs for every grid cell of the target area """
+
+    def __init__(self, mic_positions, sound_speed=solver.SOUND_SPEED, x_limit=solver.RECT_X_LIMIT,
+                 y_limit=solver.RECT_Y_LIMIT, step=GRID_STEP, table=None):
+        self.mic_positions = np.asarray(mic_positions, dtype=np.float64)
+        self.sound_speed = sound_speed
+        self.x_limit = x_limit
+        self.y_limit = y_limit
+        self.step = step
+        self.pairs = mic_pairs(len(self.mic_positions))
+        self.xs = np.arange(x_limit[0], x_limit[1] + step / 2, step, dtype=np.float32)
+        self.ys = np.arange(y_limit[0], y_limit[1] + step / 2, step, dtype=np.float32)
+        self.table = self._build() if table is None else table
+        self._subsets = {}  # 활성 열 tuple -> (열 부분 테이블, 행별 제곱합)
+
+    def _build(self):
+        gx, gy = np.meshgrid(self.xs, self.ys, indexing="ij")
+        cells = np.column_stack([gx.ravel(), gy.ravel()]).astype(np.float64)
+        arrivals = np.linalg.norm(cells[:, None, :] - self.mic_positions[None, :, :], axis=2) / self.sound_speed
+        return (arrivals[:, self.pairs[:, 1]] - arrivals[:, self.pairs[:, 0]]).astype(np.float32)
+
+    @classmethod
+    def load_or_build(cls, mic_positions, sound_speed=solver.SOUND_SPEED, x_limit=solver.RECT_X_LIMIT,
+                      y_limit=solver.RECT_Y_LIMIT, step=GRID_STEP, cache_dir=GRID_DIR):
+        """ mmap the cached .npy for this geometry, or build and save it """
+        fp = fingerprint(mic_positions, sound_speed, x_limit, y_limit, step)
+        path = os.path.join(cache_dir, f"tdoa_grid_{fp}.npy")
+        if os.path.exists(path):
+            table = np.load(path, mmap_mode="r")
+            return cls(mic_positions, sound_speed, x_limit, y_limit, step, table=table)
+
+        grid = cls(mic_positions, sound_speed, x_limit, y_limit, step)
+        os.makedirs(cache_dir, exist_ok=True)
+        # 프로세스마다 다른 임시 파일에 쓴 뒤 교체 -> 중간에 종료돼도, 여러 프로세스가 동시에 만들어도 깨지지 않음
+        fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".npy")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, grid.table)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return grid
+
+    def cell_position(self, index):
+        ix, iy = np.divmod(index, len(self.ys))
+        return np.column_stack([self.xs[ix], self.ys[iy]]).astype(np.float64)
+
+    def _columns(self, mics):
+        """ Pair columns usable when only the given mic indices are active """
+        if mics is None:
+            return np.arange(len(self.pairs)), self.pairs
+        active = np.isin(self.pairs, mics).all(axis=1)
+        return np.flatnonzero(active), self.pairs[active]
+
+    def nearest(self, time_diffs, mics=None):
+        """
+        time_diffs: (N, K) 도달 시간차 (K = 활성 마이크 수, mics 순서)
+        return: (N, 2) 최근접 격자 좌표
+        """
+        time_diffs = np.atleast_2d(np.asarray(time_diffs, dtype=np.float64))
+        mics = None if mics is None else np.asarray(mics)
+        cols, pairs = self._columns(mics)
+        if mics is not None:
+            # 전체 마이크 번호 -> time_diffs 열 번호
+            lookup = np.full(len(self.mic_positions), -1)
+            lookup[mics] = np.arange(len(mics))
+            pairs = lookup[pairs]
+
+        measured = (time_diffs[:, pairs[:, 1]] - time_diffs[:, pairs[:, 0]]).astype(np.float32)
+        table, norms = self._subset(cols)
+
+        best = np.empty(len(measured), dtype=np.int64)
+        for start in range(0, len(measured), LOOKUP_BATCH):
+            chunk = measured[start:start + LOOKUP_BATCH]
+            # |g - m|^2 = |g|^2 - 2 g.m + |m|^2 (|m|^2 는 argmin 에 영향 없음)
+            score = norms[None, :] - 2 * chunk @ table.T
+            best[start:start + LOOKUP_BATCH] = np.argmin(score, axis=1)
+        return self.cell_position(best)
+
+    def _subset(self, cols):
+        """ Column subset of the table and its row norms, built once per active-mic set """
+        key = tuple(cols)
+        if key not in self._subsets:
+            # 전체 열이면 (mmap) 테이블을 그대로 사용, 일부면 한 번만 복사
+            table = self.table if key == tuple(range(self.table.shape[1])) else np.ascontiguousarray(self.table[:, cols])
+            self._subsets[key] = (table, (table ** 2).sum(axis=1))
+        return self._subsets[key]
+
+    def locate(self, time_diffs, mics=None, clamp=True):
+        """ Grid lookup + local Gauss-Newton refinement -> (N, 2) positions, (N,) residual """
+        time_diffs = np.atleast_2d(np.asarray(time_diffs, dtype=np.float64))
+        positions = self.mic_positions if mics is None else self.mic_positions[np.asarray(mics)]
+
+        guess = self.nearest(time_diffs, mics)
+        range_diffs = (time_diffs - time_diffs[:, :1]) * self.sound_speed
+        pos = solver.gauss_newton(guess, range_diffs, positions, iterations=2)
+        bad = ~np.isfinite(pos).all(axis=1)
+        pos[bad] = guess[bad]
+
+        residual = solver.residual_loss(pos, time_diffs, positions, self.sound_speed)
+        if clamp:
+            pos[:, 0] = np.clip(pos[:, 0], *self.x_limit)
+            pos[:, 1] = np.clip(pos[:, 1], *self.y_limit)
+        return pos, residual
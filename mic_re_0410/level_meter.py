@@ -0,0 +1,53 @@
+import time
+import numpy as np
+
+"""
+- 캡처 스트림에서 직접 RMS / 피크 dB 측정 (sox 프로세스 실행 없음)
+- CaptureEngine 콜백에 tap 으로 연결, hop 마다 마이크별 값 갱신
+- levels() / get_sound_level() 호출은 저장된 값만 읽으므로 마이크로초 단위
+"""
+
+METER_HOP = 4800  # 100ms @ 48kHz (콜백 블록 단위로 반올림됨)
+SILENCE_DB = -100  # 기존 get_sound_level 의 무음 값과 동일
+
+
+def to_db(value):
+    return 20 * np.log10(value) if value > 0 else SILENCE_DB
+
+
+class LevelMeter:
+    """ Per-mic RMS/peak dB published every hop, fed from the capture callback """
+
+    def __init__(self, mics, hop=METER_HOP):
+        self.hop = hop
+        self._sum_sq = {mic: 0.0 for mic in mics}
+        self._peak = {mic: 0 for mic in mics}
+        self._count = {mic: 0 for mic in mics}
+        # mic -> (rms_db, peak_db, monotonic time) / 튜플 교체는 원자적이라 lock 불필요
+        self._levels = {mic: (SILENCE_DB, SILENCE_DB, 0.0) for mic in mics}
+
+    def attach(self, engine):
+        engine.add_tap(self.feed)
+        return self
+
+    def feed(self, mic, samples):
+        x = samples.astype(np.float32)
+        self._sum_sq[mic] += float(np.dot(x, x))
+        # int16 그대로 abs 하면 -32768 이 -32768 로 남음 -> 변환한 값으로 최대 크기 계산
+        self._peak[mic] = max(self._peak[mic], int(np.abs(x).max(initial=0)))
+        self._count[mic] += len(samples)
+
+        if self._count[mic] >= self.hop:
+            rms = np.sqrt(self._sum_sq[mic] / self._count[mic]) / 32768.0
+            self._levels[mic] = (to_db(rms), to_db(self._peak[mic] / 32768.0), time.monotonic())
+            self._sum_sq[mic] = 0.0
+            self._peak[mic] = 0
+            self._count[mic] = 0
+
+    def levels(self):
+        """ {mic: (rms_db, peak_db, timestamp)} of the last completed hop """
+        return dict(self._levels)
+
+    def get_sound_level(self, mic):
+        """ RMS dB of the last hop, same meaning as the old sox based get_sound_level() """
+        return self._levels[mic][0]
@@ -0,0 +1,200 @@
+import argparse
+import collections
+import socket
+import threading
+import time
+import numpy as np
+
+import detect_ver4 as live
+from capture import CaptureEngine
+from drift import DriftTracker
+from frames import FrameBuffer
+from pipeline import DetectionPipeline
+from protocol import CODEC_RAW, CODEC_ZLIB, encode_hello, encode_window, encode_features
+
+"""
+- 센서 노드 모드: Pi 는 캡처 + 드리프트 보정 + onset 구간 자르기만 하고, 위치 추정은 aggregator.py (중앙 PC) 가 처리
+- 보내는 것: onset 주변 다채널 int16 구간 (WINDOW), --features 면 청크(100ms)마다 마이크별 RMS dB (FEATURES)
+- --compress: 시간축 차분 + zlib 무손실 압축
+- 전송은 백그라운드 스레드 (캡처 루프는 네트워크로 멈추지 않음), 연결이 끊기면 RECONNECT_SECONDS 후 재연결
+  끊긴 동안 구간은 크기 제한 큐에 보관 (가득 차면 오래된 것부터 버림)
+  FEATURES 는 큐에 넣지 않고 최신 것 하나만 보관 (레벨 갱신이 밀린 구간을 밀어내지 않음)
+- 실행: python3 node.py --aggregator 192.168.0.10:6060 --node target_1 [--compress] [--features] [--replay ...]
+"""
+
+AGGREGATOR_PORT = 6060
+QUEUE_SIZE = 256          # 전송 대기 프레임 수
+RECONNECT_SECONDS = 2.0
+CONNECT_TIMEOUT = 5.0
+
+
+class NodeLink:
+    """ Background TCP sender to the aggregator; send() only queues, HELLO is resent on every connect """
+
+    def __init__(self, host, port, hello, queue_size=QUEUE_SIZE):
+        self.host = host
+        self.port = port
+        self.hello = hello
+        self.frames = collections.deque(maxlen=queue_size)
+        self.latest = None  # send_latest() 프레임 (최신 것만, 큐 밖)
+        self.connected = False
+        self.sent_frames = 0
+        self.sent_bytes = 0
+        self.dropped = 0
+        self._cond = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def send(self, frame):
+        with self._cond:
+            if len(self.frames) == self.frames.maxlen:
+                self.dropped += 1
+            self.frames.append(frame)
+            self._cond.notify()
+
+    def send_latest(self, frame):
+        """ Replace the pending status frame (FEATURES); never evicts queued windows """
+        with self._cond:
+            self.latest = frame
+            self._cond.notify()
+
+    def pending(self):
+        return len(self.frames)
+
+    def close(self, timeout=5.0):
+        """ Wait up to timeout for queued frames to go out, then stop """
+        deadline = time.monotonic() + timeout
+        while self.frames and self.connected and time.monotonic() < deadline:
+            time.sleep(0.01)
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join()
+
+    def _take(self):
+        with self._cond:
+            while self._running and not self.frames and self.latest is None:
+                self._cond.wait(0.5)
+            batch = list(self.frames)
+            self.frames.clear()
+            latest, self.latest = self.latest, None
+            return batch, latest
+
+    def _requeue(self, batch, latest):
+        # 못 보낸 프레임은 다시 앞에 (그 사이 새 프레임이 많으면 오래된 것부터 버려짐)
+        with self._cond:
+            if self.latest is None:
+                self.latest = latest  # 그 사이 새 레벨이 왔으면 옛 것은 버림
+            room = self.frames.maxlen - len(self.frames)
+            self.dropped += max(0, len(batch) - room)
+            self.frames.extendleft(reversed(batch[len(batch) - room:] if room > 0 else []))
+
+    def _run(self):
+        while self._running:
+            try:
+                sock = socket.create_connection((self.host, self.port), timeout=CONNECT_TIMEOUT)
+            except OSError:
+                time.sleep(RECONNECT_SECONDS)
+                continue
+            sock.settimeout(None)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            try:
+                sock.sendall(self.hello)
+                self.connected = True
+                while self._running:
+                    batch, latest = self._take()
+                    frames = batch if latest is None else batch + [latest]
+                    if not frames:
+                        continue
+                    data = b"".join(frames)
+                    try:
+                        sock.sendall(data)
+                    except OSError:
+                        self._requeue(batch, latest)
+                        raise
+                    self.sent_frames += len(frames)
+                    self.sent_bytes += len(data)
+            except OSError:
+                pass
+            finally:
+                self.connected = False
+                sock.close()
+            if self._running:
+                time.sleep(RECONNECT_SECONDS)
+
+
+class SensorNode:
+    """ Runs segmentation only and ships every aligned onset window to the aggregator """
+
+    def __init__(self, link, mic_positions, rate=live.RATE, onset_ratio_db=live.ONSET_RATIO_DB,
+                 drift=None, compress=False):
+        self.link = link
+        self.codec = CODEC_ZLIB if compress else CODEC_RAW
+        self.pipeline = DetectionPipeline(mic_positions, rate, live.SOUND_SPEED, onset_ratio_db,
+                                          drift=drift, segment_only=True)
+        self.seq = 0
+        self.raw_bytes = 0  # 압축 전 크기 (비교용)
+
+    def process(self, signals):
+        """ signals: (M, n) float32 -> number of windows sent """
+        segments = self.pipeline.segments(signals)
+        for segment in segments:
+            self.seq += 1
+            samples = np.clip(np.rint(segment["window"] * 32768.0), -32768, 32767).astype(np.int16)
+            onsets = np.where(segment["onsets"] >= 0, segment["onsets"] - segment["start"], -1)
+            offsets = segment.get("offsets", np.zeros(len(onsets)))
+            self.raw_bytes += samples.nbytes
+            self.link.send(encode_window(self.seq, segment["time"], onsets, offsets, samples, self.codec))
+        return len(segments)
+
+    def send_levels(self, levels_db):
+        self.link.send_latest(encode_features(levels_db))
+
+
+def parse_address(text, default_port=AGGREGATOR_PORT):
+    host, _, port = text.partition(":")
+    return host, int(port) if port else default_port
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--aggregator", required=True, metavar="HOST[:PORT]")
+    parser.add_argument("--node", default=socket.gethostname(), help="노드 이름 (과녁 구분)")
+    parser.add_argument("--compress", action="store_true", help="구간 무손실 압축 (차분 + zlib)")
+    parser.add_argument("--features", action="store_true", help="100ms 마다 마이크별 RMS dB 전송")
+    parser.add_argument("--replay", nargs="+", metavar="WAV", help="마이크 대신 재생할 WAV 파일")
+    parser.add_argument("--combined", action="store_true", help=f"다채널 장치 {live.MIC_ARRAY_DEVICE} 로 캡처")
+    args = parser.parse_args()
+
+    host, port = parse_address(args.aggregator)
+    link = NodeLink(host, port, encode_hello(args.node, live.RATE, live.MIC_POSITIONS))
+    node = SensorNode(link, live.MIC_POSITIONS, live.RATE, drift=DriftTracker(len(live.MIC_POSITIONS), live.RATE),
+                      compress=args.compress)
+
+    devices, channels = live.open_devices(args.replay, args.combined)
+    engine = CaptureEngine(devices, rate=live.RATE, hop=live.HOP, channels=channels)
+    reader = engine.reader()
+    frame = FrameBuffer(node.pipeline.mics, live.CHUNK)
+    print(f"Node {args.node} -> aggregator {host}:{port} (Ctrl+C to stop)")
+
+    try:
+        engine.start()
+        if not args.replay and not args.combined:
+            print(f"Start alignment (skipped samples): {reader.align()}")
+        while frame.fill(reader):
+            if node.process(frame.data):
+                print(f"Sent event window #{node.seq} (queue {link.pending()}, connected {link.connected})")
+            if args.features:
+                node.send_levels(frame.rms_db())
+    except KeyboardInterrupt:
+        print("Node stopped by user.")
+    finally:
+        engine.stop()
+        link.close()
+        print(f"Sent {link.sent_frames} frames / {link.sent_bytes} bytes "
+              f"(windows raw {node.raw_bytes} bytes), dropped {link.dropped}")
+
+
+if __name__ == "__main__":
+    main()
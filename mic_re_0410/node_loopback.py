@@ -0,0 +1,98 @@
+import argparse
+import sys
+import threading
+import time
+import numpy as np
+
+import detect_ver4 as live
+from aggregator import Aggregator
+from node import NodeLink, SensorNode
+from pipeline import HIT
+from protocol import encode_hello
+from synth import synthesize, random_sources
+
+"""
+- 장비 / 네트워크 없이 127.0.0.1 에서 센서 노드 -> aggregator 전체 경로 확인
+- 노드 N개가 각자 합성 타격음을 청크 단위로 처리해 구간 전송, aggregator 가 위치 추정
+- 출력: 노드별 감지 / 오차 p50, 전송 byte (압축 전 / 후), 최대 처리 대기 구간 수, 노드 전송 ~ 위치 추정 지연 p50 / p99
+- 노드별 이벤트가 seq 순서로 왔는지도 확인 (작업 프로세스 풀에서 순서가 섞이면 FAIL)
+- 실행: python3 node_loopback.py [--nodes 3] [--events 40] [--compress] [--workers N]
+"""
+
+EVENT_SPACING = 0.5
+MATCH_WINDOW = 0.02
+ERROR_MAX_MM = 50.0  # 이 이하 오차 p50 이면 PASS
+
+
+def run_node(name, port, num_events, compress, seed, results):
+    mic_positions = np.array(list(live.MIC_POSITIONS.values()), dtype=np.float64)
+    sources = random_sources(num_events, live.RECT_X_LIMIT, live.RECT_Y_LIMIT, seed)
+    times = 1.0 + np.arange(num_events) * EVENT_SPACING
+    audio = synthesize(sources, times, mic_positions, times[-1] + 1.0, live.RATE, live.SOUND_SPEED,
+                       noise_db=-60.0, reverb_seconds=0.0, seed=seed)
+    signals = (audio.astype(np.float32) / 32768.0)
+
+    link = NodeLink("127.0.0.1", port, encode_hello(name, live.RATE, live.MIC_POSITIONS))
+    node = SensorNode(link, live.MIC_POSITIONS, live.RATE, compress=compress)
+    for pos in range(0, signals.shape[1] - live.CHUNK + 1, live.CHUNK):
+        node.process(signals[:, pos:pos + live.CHUNK])
+    link.close(timeout=30)
+    first_arrival = times + np.linalg.norm(sources[:, None] - mic_positions[None], axis=2).min(axis=1) / live.SOUND_SPEED
+    results[name] = (sources, first_arrival, node.seq, node.raw_bytes, link.sent_bytes, link.dropped)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=3)
+    parser.add_argument("--events", type=int, default=40)
+    parser.add_argument("--compress", action="store_true")
+    parser.add_argument("--workers", type=int, help="aggregator 위치 추정 프로세스 수 (기본: 코어 수)")
+    args = parser.parse_args()
+
+    events = {}
+    lock = threading.Lock()
+
+    def on_event(event):
+        with lock:
+            events.setdefault(event["node"], []).append(event)
+
+    aggregator = Aggregator("127.0.0.1", 0, on_event, args.workers).start()
+    results = {}
+    threads = [threading.Thread(target=run_node, args=(f"node_{i}", aggregator.port, args.events, args.compress, i, results))
+               for i in range(args.nodes)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # 마지막 구간까지 수신 + 위치 추정이 끝날 때까지 대기
+    deadline = time.monotonic() + 60
+    stats = aggregator.stats()
+    while time.monotonic() < deadline and any(
+            name not in stats or stats[name]["windows"] < results[name][2] or stats[name]["queue"] for name in results):
+        time.sleep(0.05)
+        stats = aggregator.stats()
+    aggregator.stop()
+
+    ok = True
+    for name, (sources, first_arrival, sent, raw_bytes, sent_bytes, dropped) in sorted(results.items()):
+        errors = []
+        for event in events.get(name, []):
+            k = int(np.argmin(np.abs(first_arrival - event["time"])))
+            if event["status"] == HIT and abs(first_arrival[k] - event["time"]) <= MATCH_WINDOW:
+                errors.append(np.hypot(event["x"] - sources[k, 0], event["y"] - sources[k, 1]))
+        p50 = float(np.median(errors)) if errors else float("nan")
+        node_stats = stats.get(name, {})
+        seqs = [event["seq"] for event in events.get(name, [])]
+        ordered = seqs == sorted(seqs)
+        print(f"  {name}: sent {sent} windows, received {node_stats.get('windows', 0)}, hits {len(errors)}/{len(sources)}, "
+              f"error p50 {p50:.1f} mm, bytes raw {raw_bytes} -> sent {sent_bytes}, dropped {dropped}, "
+              f"max queue {node_stats.get('max_queue', 0)}, {'in order' if ordered else 'OUT OF ORDER'}, "
+              f"latency p50 {node_stats.get('latency_p50_ms', float('nan')):.1f} ms p99 {node_stats.get('latency_p99_ms', float('nan')):.1f} ms")
+        if node_stats.get("windows", 0) != sent or not p50 <= ERROR_MAX_MM or not ordered:
+            ok = False
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
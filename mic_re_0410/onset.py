@@ -0,0 +1,84 @@
+import numpy as np
+
+"""
+- 마이크별 적응형 잡음 바닥(noise floor) + 에너지 기반 onset 감지
+- 고정 THRESHOLD_DB 와 시작 시 10초 배경 소음 측정(remake_1.py) 대체
+- 짧은 hop 단위로 O(1) 처리 (청크 전체 재계산 없음)
+- onset 위치는 hop 안에서 샘플 단위로 계산
+"""
+
+HOP_SIZE = 240           # 5ms @ 48kHz (CHUNK 4800 의 약수)
+ONSET_RATIO_DB = 12.0    # 잡음 바닥보다 이만큼 크면 onset
+NOISE_ALPHA = 0.01       # 잡음 바닥 EWMA 계수 (작을수록 천천히 변함)
+MIN_FLOOR_DB = -90.0
+HOLDOFF_HOPS = 20        # onset 이후 재감지 금지 hop 수 (약 100ms)
+WARMUP_HOPS = 20         # 잡음 바닥 초기 학습 hop 수
+
+
+class OnsetDetector:
+    """ Streaming per-mic onset detector with an EWMA noise floor (all mics processed together) """
+
+    def __init__(self, num_mics, hop_size=HOP_SIZE, ratio_db=ONSET_RATIO_DB, alpha=NOISE_ALPHA,
+                 holdoff_hops=HOLDOFF_HOPS, warmup_hops=WARMUP_HOPS):
+        self.num_mics = num_mics
+        self.hop_size = hop_size
+        self.ratio = 10 ** (ratio_db / 10)  # 에너지(전력) 비율
+        self.alpha = alpha
+        self.holdoff_hops = holdoff_hops
+        self.warmup_hops = warmup_hops
+        self.floor = np.full(num_mics, 10 ** (MIN_FLOOR_DB / 10))
+        self.prev_energy = self.floor.copy()
+        self.holdoff = np.zeros(num_mics, dtype=np.int64)
+        self.hops = 0
+        self.position = 0  # 지금까지 처리한 샘플 수
+        self._power = np.zeros((num_mics, hop_size), dtype=np.float32)  # hop 마다 재사용
+
+    def floor_db(self):
+        return 10 * np.log10(self.floor)
+
+    def process_hop(self, hop):
+        """
+        hop: (num_mics, hop_size) float32 신호
+        return: onset 샘플 위치 (num_mics,) 절대 위치, onset 없으면 -1 / hop 에너지 (dB)
+        """
+        hop = np.asarray(hop, dtype=np.float32)
+        power = np.multiply(hop, hop, out=self._power[:, :hop.shape[1]])
+        energy = np.maximum(np.mean(power, axis=1, dtype=np.float64), 10 ** (MIN_FLOOR_DB / 10))
+        flux = np.maximum(energy - self.prev_energy, 0.0)  # 에너지 증가분 (spectral flux 의 시간 영역 근사)
+        self.prev_energy = energy
+
+        onsets = np.full(self.num_mics, -1, dtype=np.int64)
+        if self.hops < self.warmup_hops:
+            # 학습 구간: 빠르게 잡음 바닥 수렴
+            rate = 1.0 / (self.hops + 1)
+            self.floor = (1 - rate) * self.floor + rate * energy if self.hops else energy.copy()
+        else:
+            hit = (energy > self.floor * self.ratio) & (flux > self.floor * (self.ratio - 1)) & (self.holdoff == 0)
+            if hit.any():
+                onsets[hit] = self.position + self._first_crossing(power[hit], self.floor[hit])
+                self.holdoff[hit] = self.holdoff_hops
+
+            # 타격음 구간은 잡음 바닥 학습에서 제외
+            quiet = energy <= self.floor * self.ratio
+            self.floor = np.where(quiet, (1 - self.alpha) * self.floor + self.alpha * energy, self.floor)
+
+        self.holdoff = np.maximum(self.holdoff - 1, 0)
+        self.hops += 1
+        self.position += hop.shape[1]
+        return onsets, 10 * np.log10(energy)
+
+    def _first_crossing(self, power, floor):
+        """ First sample whose instantaneous power exceeds the onset level, per row """
+        above = power > (floor * self.ratio)[:, None]
+        first = np.argmax(above, axis=1)
+        return np.where(above.any(axis=1), first, 0)
+
+    def process(self, block):
+        """ Split a (num_mics, n) block into hops; leftover samples (n % hop_size) are ignored """
+        block = np.asarray(block)
+        onsets = []
+        for start in range(0, block.shape[1] - self.hop_size + 1, self.hop_size):
+            hop_onsets, _ = self.process_hop(block[:, start:start + self.hop_size])
+            if (hop_onsets >= 0).any():
+                onsets.append(hop_onsets)
+        return onsets
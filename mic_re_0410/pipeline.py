@@ -0,0 +1,142 @@
+import numpy as np
+
+from tdoa import estimate_time_diffs, gcc_phat, max_delay
+from grid import TdoaGrid
+from robust import select_pairs, robust_locate
+from segmenter import EventSegmenter
+
+"""
+- detect_ver4 의 감지 + 위치 추정 과정을 장치와 분리한 파이프라인
+- 실시간(detect_ver4) 과 오프라인 재생(replay.py) 이 같은 코드를 사용
+- 출력/로그 없이 이벤트 dict 만 반환
+- onset 주변 구간(segmenter.py)만 TDOA / 위치 추정 -> 청크 경계에 걸친 타격음도 한 번에 처리
+- drift (drift.py DriftTracker) 를 주면 입력을 클럭 드리프트 보정 후 처리, 남은 샘플 이하 오차는 시간차에서 뺌
+  (segments() 가 구간마다 보정값을 붙임 -> 센서 노드에서 잘라 보낸 구간도 aggregator 가 같은 localize() 로 처리)
+- adopt(): 설정 변경 시 백그라운드에서 만든 새 pipeline 이 실행 중인 pipeline 의 드리프트 / 구간 상태를 이어받음 (config.py)
+- onset 마이크가 ROBUST_MIN_MICS 개 이상이면 robust.py (이웃 쌍 + RANSAC) 로 위치 추정, 이상한 마이크는 제외
+"""
+
+RATE = 48000
+SOUND_SPEED = 343000  # mm/s
+ONSET_RATIO_DB = 12.0
+RESIDUAL_THRESHOLD = 0.005
+GCC_QUALITY_MIN = 0.1
+CONFIDENCE_MIN = 10  # %
+ROBUST_MIN_MICS = 4  # 이 개수 이상이면 격자 대신 robust_locate 사용
+RECT_X_LIMIT = (0, 400)  # mm
+RECT_Y_LIMIT = (0, 1000)  # mm
+
+# 이벤트 status
+HIT = "hit"
+LOW_QUALITY = "low_quality"
+LOW_CONFIDENCE = "low_confidence"
+
+
+class DetectionPipeline:
+    """ Onset detection -> GCC-PHAT TDOA -> grid localization for one (mics x samples) chunk at a time """
+
+    def __init__(self, mic_positions, rate=RATE, sound_speed=SOUND_SPEED, onset_ratio_db=ONSET_RATIO_DB,
+                 residual_threshold=RESIDUAL_THRESHOLD, quality_min=GCC_QUALITY_MIN,
+                 x_limit=RECT_X_LIMIT, y_limit=RECT_Y_LIMIT, grid=None, drift=None, segment_only=False):
+        # segment_only: 센서 노드용, segments() 만 사용 (격자 생성 / 로드 생략)
+        # mic_positions: {"left": [x, y], ...} (이 순서가 신호 배열의 행 순서)
+        self.mics = list(mic_positions)
+        self.positions = np.array([mic_positions[mic] for mic in self.mics], dtype=np.float64)
+        self.rate = rate
+        self.residual_threshold = residual_threshold
+        self.quality_min = quality_min
+        self.max_tau = max_delay(self.positions, sound_speed)
+        self.sound_speed = sound_speed
+        self.x_limit, self.y_limit = x_limit, y_limit
+        self.grid = None if segment_only else grid or TdoaGrid.load_or_build(self.positions, sound_speed,
+                                                                               x_limit, y_limit)
+        self.drift = drift
+        self.segmenter = EventSegmenter(len(self.mics), rate, self.max_tau, onset_ratio_db=onset_ratio_db)
+
+    def process(self, signals):
+        """
+        signals: (M, N) float32, self.mics 순서 (길이 자유)
+        return: 이 청크에서 완성된 이벤트 dict 목록
+        """
+        events = []
+        for segment in self.segments(signals):
+            event = self.localize(segment)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def adopt(self, old):
+        """ Take over a running pipeline's stream state (drift tracker, segmenter); call from the capture thread """
+        if old.mics != self.mics or old.rate != self.rate:
+            raise ValueError(f"마이크 구성이 다릅니다 ({old.mics} -> {self.mics})")
+        self.drift = old.drift
+        self.segmenter.adopt(old.segmenter)
+
+    def segments(self, signals):
+        """
+        Drift compensation + onset segmentation only (센서 노드는 여기까지만 하고 구간을 전송)
+        segment: {"trigger", "start", "onsets", "window", "time" (초), "offsets" (마이크별 남은 드리프트, 초)}
+        """
+        if self.drift is not None:
+            signals = self.drift.process(signals)
+        segments = self.segmenter.push(signals)
+        for segment in segments:
+            segment["time"] = segment["trigger"] / self.rate
+            if self.drift is not None:
+                segment["time"] -= self.drift.latency()
+                segment["offsets"] = self.drift.residual()
+        return segments
+
+    def localize(self, segment):
+        """ TDOA + position for one segmenter window (None if fewer than 2 mics had an onset) """
+        active = np.flatnonzero(segment["onsets"] >= 0)
+        if len(active) < 2:
+            return None
+
+        event = {
+            "time": segment.get("time", segment["trigger"] / self.rate),
+            "mics": [self.mics[i] for i in active],
+        }
+        offsets = segment.get("offsets")
+        if len(active) >= ROBUST_MIN_MICS:
+            located = self._robust(segment["window"], active, event, offsets)
+        else:
+            time_diffs, quality = estimate_time_diffs(segment["window"][active], self.rate, self.max_tau)
+            if offsets is not None:
+                time_diffs = time_diffs - offsets[active]
+                time_diffs -= time_diffs.min()
+            event["quality"] = quality
+            located = None
+            if quality >= self.quality_min:
+                pos, residual = self.grid.locate(time_diffs, mics=active)
+                located = pos[0], float(residual[0])
+        if located is None:
+            event["status"] = LOW_QUALITY
+            return event
+
+        pos, residual = located
+        confidence = max(0, 1 - (residual / self.residual_threshold)) * 100
+        event.update(x=float(pos[0]), y=float(pos[1]), residual=residual, confidence=confidence,
+                     status=HIT if confidence >= CONFIDENCE_MIN else LOW_CONFIDENCE)
+        return event
+
+    def _robust(self, window, active, event, offsets=None):
+        """ Neighbour-pair GCC-PHAT + RANSAC over mic triples; returns (pos, residual) or None """
+        pairs = select_pairs(self.positions, active)
+        local = np.searchsorted(active, pairs)
+        delays, quality, _ = gcc_phat(window[active], self.rate, self.max_tau, pairs=local)
+        if offsets is not None:
+            delays = delays - (offsets[pairs[:, 1]] - offsets[pairs[:, 0]])
+
+        # 품질 낮은 쌍은 버리고 남은 쌍으로 가설 생성
+        good = quality >= self.quality_min
+        event["quality"] = float(np.median(quality)) if len(quality) else 0.0
+        if good.sum() < 2:
+            return None
+        result = robust_locate(delays[good], quality[good], pairs[good], self.positions, self.sound_speed,
+                               x_limit=self.x_limit, y_limit=self.y_limit)
+        if result is None:
+            return None
+        pos, residual, inliers = result
+        event["mics"] = [self.mics[i] for i in inliers]
+        return pos, residual
@@ -0,0 +1,208 @@
+import json
+import struct
+import time
+import zlib
+
+"""
+- mic_server / mic_client 공용 전송 형식 (numpy 없이 표준 라이브러리만 사용)
+- 프레임 = [길이 4 byte][종류 1 byte][내용], 길이는 내용 byte 수 (little-endian)
+- HIT: 순번(seq), 시간, 좌표, 신뢰도, residual, status -> 타격 1개당 40 byte
+- HEARTBEAT: 1초마다 서버 시간 (기존 "Connect" 문자열 대신)
+- 재연결 이어받기: 클라이언트가 접속 직후 SUBSCRIBE (서버 세션, 마지막으로 처리한 seq) 전송
+  서버는 WELCOME (세션, 보관 중인 첫 / 마지막 seq) 후 놓친 HIT 를 REPLAY 프레임으로 한 번에 보내고 실시간 전송 계속
+- 센서 노드 -> aggregator (node.py / aggregator.py)
+  HELLO: 노드 이름, 샘플링 레이트, 마이크 위치 (JSON, 연결마다 1번)
+  WINDOW: onset 주변 다채널 int16 구간 + 마이크별 onset 위치 / 드리프트 보정값, 선택적 무손실 압축 (차분 + zlib)
+  FEATURES: 마이크별 RMS dB (저속 연속 전송)
+- WINDOW / FEATURES 는 numpy 필요 (함수 안에서 import, 클라이언트는 numpy 없이 사용 가능)
+"""
+
+HEADER = struct.Struct("<IB")            # payload 길이, 종류
+HIT = struct.Struct("<QdffffB")          # seq, epoch 초, x, y, confidence, residual, status
+HEARTBEAT = struct.Struct("<d")          # epoch 초
+WINDOW = struct.Struct("<QddHIB")        # seq, epoch 초, stream 초, 마이크 수, 샘플 수, codec
+FEATURES = struct.Struct("<dH")          # epoch 초, 마이크 수 (뒤에 float32 x 마이크 수)
+SUBSCRIBE = struct.Struct("<QQ")         # 서버 세션 (0 = 처음 접속), 마지막으로 처리한 seq
+WELCOME = struct.Struct("<QQQ")          # 서버 세션, 보관 중인 첫 seq, 마지막 seq (0 = 없음)
+REPLAY = struct.Struct("<I")             # HIT 개수 (뒤에 HIT x 개수)
+
+MSG_HEARTBEAT = 0
+MSG_HIT = 1
+MSG_HELLO = 2
+MSG_WINDOW = 3
+MSG_FEATURES = 4
+MSG_SUBSCRIBE = 5
+MSG_WELCOME = 6
+MSG_REPLAY = 7
+
+CODEC_RAW = 0
+CODEC_ZLIB = 1     # 시간축 차분 int16 + zlib (무손실)
+ZLIB_LEVEL = 1
+
+MAX_PAYLOAD = 1 << 20                    # 이보다 큰 길이는 잘못된 스트림으로 봄
+STATUS = ("hit", "low_quality", "low_confidence")  # event_store.STATUS_CODES 와 같은 순서
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def encode_frame(kind, payload):
+    return HEADER.pack(len(payload), kind) + payload
+
+
+def encode_hit(seq, event, t=None):
+    """ Pipeline event dict -> HIT frame (missing fields become NaN) """
+    nan = float("nan")
+    payload = HIT.pack(seq, time.time() if t is None else t,
+                       event.get("x", nan), event.get("y", nan),
+                       event.get("confidence", nan), event.get("residual", nan),
+                       STATUS.index(event["status"]))
+    return encode_frame(MSG_HIT, payload)
+
+
+def encode_heartbeat(t=None):
+    return encode_frame(MSG_HEARTBEAT, HEARTBEAT.pack(time.time() if t is None else t))
+
+
+def encode_subscribe(session=0, last_seq=0):
+    return encode_frame(MSG_SUBSCRIBE, SUBSCRIBE.pack(session, last_seq))
+
+
+def encode_welcome(session, first_seq, last_seq):
+    return encode_frame(MSG_WELCOME, WELCOME.pack(session, first_seq, last_seq))
+
+
+def encode_replay(hit_frames):
+    """ HIT frames -> REPLAY frames (as few as MAX_PAYLOAD allows) """
+    per_frame = (MAX_PAYLOAD - REPLAY.size) // HIT.size
+    frames = []
+    for i in range(0, len(hit_frames), per_frame):
+        batch = hit_frames[i:i + per_frame]
+        payload = REPLAY.pack(len(batch)) + b"".join(frame[HEADER.size:] for frame in batch)
+        frames.append(encode_frame(MSG_REPLAY, payload))
+    return frames
+
+
+def encode_hello(node, rate, mic_positions):
+    """ mic_positions: {"left": [x, y], ...} (신호 행 순서) """
+    info = {"node": node, "rate": rate, "mics": {mic: [float(v) for v in pos] for mic, pos in mic_positions.items()}}
+    return encode_frame(MSG_HELLO, json.dumps(info).encode("utf-8"))
+
+
+def encode_window(seq, stream_time, onsets, offsets, samples, codec=CODEC_RAW, t=None):
+    """
+    samples: (M, N) int16 구간, onsets: (M,) 구간 시작 기준 onset 샘플 (-1 = 없음),
+    offsets: (M,) 남은 드리프트 보정 (초, 시간차에서 뺄 값)
+    """
+    import numpy as np
+
+    samples = np.ascontiguousarray(samples, dtype="<i2")
+    num_mics, length = samples.shape
+    if codec == CODEC_ZLIB:
+        delta = np.diff(samples, axis=1, prepend=np.zeros((num_mics, 1), dtype="<i2")).astype("<i2")
+        data = zlib.compress(delta.tobytes(), ZLIB_LEVEL)
+    else:
+        data = samples.tobytes()
+    payload = (WINDOW.pack(seq, time.time() if t is None else t, stream_time, num_mics, length, codec)
+               + np.asarray(onsets, dtype="<i4").tobytes()
+               + np.asarray(offsets, dtype="<f4").tobytes()
+               + data)
+    return encode_frame(MSG_WINDOW, payload)
+
+
+def decode_window(payload):
+    """ WINDOW payload -> dict(seq, t, stream_time, onsets, offsets, samples (M, N) int16) """
+    import numpy as np
+
+    seq, t, stream_time, num_mics, length, codec = WINDOW.unpack_from(payload)
+    pos = WINDOW.size
+    onsets = np.frombuffer(payload, dtype="<i4", count=num_mics, offset=pos)
+    pos += 4 * num_mics
+    offsets = np.frombuffer(payload, dtype="<f4", count=num_mics, offset=pos).astype(np.float64)
+    pos += 4 * num_mics
+    data = payload[pos:]
+    if codec == CODEC_ZLIB:
+        delta = np.frombuffer(zlib.decompress(data), dtype="<i2").reshape(num_mics, length)
+        samples = np.cumsum(delta, axis=1, dtype=np.int16)
+    elif codec == CODEC_RAW:
+        samples = np.frombuffer(data, dtype="<i2").reshape(num_mics, length)
+    else:
+        raise ProtocolError(f"unknown codec {codec}")
+    return {"seq": seq, "t": t, "stream_time": stream_time, "onsets": onsets.astype(np.int64),
+            "offsets": offsets, "samples": samples}
+
+
+def encode_features(levels_db, t=None):
+    """ levels_db: (M,) 마이크별 RMS dB """
+    import numpy as np
+
+    levels = np.asarray(levels_db, dtype="<f4")
+    return encode_frame(MSG_FEATURES, FEATURES.pack(time.time() if t is None else t, len(levels)) + levels.tobytes())
+
+
+def _decode_hit(payload, offset=0):
+    seq, t, x, y, confidence, residual, status = HIT.unpack_from(payload, offset)
+    return {"type": "hit", "seq": seq, "t": t, "x": x, "y": y,
+            "confidence": confidence, "residual": residual, "status": STATUS[status]}
+
+
+def decode(kind, payload):
+    """ (kind, payload) -> dict with a "type" key """
+    if kind == MSG_HIT:
+        if len(payload) != HIT.size:
+            raise ProtocolError(f"bad HIT size {len(payload)}")
+        return _decode_hit(payload)
+    if kind == MSG_HEARTBEAT:
+        return {"type": "heartbeat", "t": HEARTBEAT.unpack(payload)[0]}
+    if kind == MSG_REPLAY:
+        (count,) = REPLAY.unpack_from(payload)
+        if len(payload) != REPLAY.size + count * HIT.size:
+            raise ProtocolError(f"bad REPLAY size {len(payload)} for {count} hits")
+        return {"type": "replay", "hits": [_decode_hit(payload, REPLAY.size + i * HIT.size) for i in range(count)]}
+    if kind == MSG_SUBSCRIBE:
+        session, last_seq = SUBSCRIBE.unpack(payload)
+        return {"type": "subscribe", "session": session, "last_seq": last_seq}
+    if kind == MSG_WELCOME:
+        session, first_seq, last_seq = WELCOME.unpack(payload)
+        return {"type": "welcome", "session": session, "first_seq": first_seq, "last_seq": last_seq}
+    if kind == MSG_HELLO:
+        return dict(json.loads(payload), type="hello")
+    if kind == MSG_WINDOW:
+        return dict(decode_window(payload), type="window")
+    if kind == MSG_FEATURES:
+        import numpy as np
+
+        t, num_mics = FEATURES.unpack_from(payload)
+        return {"type": "features", "t": t,
+                "levels": np.frombuffer(payload, dtype="<f4", count=num_mics, offset=FEATURES.size)}
+    return {"type": "unknown", "kind": kind, "payload": payload}
+
+
+def _check_length(length):
+    if length > MAX_PAYLOAD:
+        raise ProtocolError(f"frame too large: {length} bytes")
+
+
+async def read_frame(reader):
+    """ asyncio StreamReader -> (kind, payload); raises asyncio.IncompleteReadError on EOF """
+    length, kind = HEADER.unpack(await reader.readexactly(HEADER.size))
+    _check_length(length)
+    return kind, await reader.readexactly(length)
+
+
+def _recv_exactly(sock, n):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        buf += chunk
+    return bytes(buf)
+
+
+def recv_frame(sock):
+    """ Blocking socket -> (kind, payload); raises ConnectionError on EOF """
+    length, kind = HEADER.unpack(_recv_exactly(sock, HEADER.size))
+    _check_length(length)
+    return kind, _recv_exactly(sock, length)
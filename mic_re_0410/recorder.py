@@ -0,0 +1,185 @@
+import json
+import threading
+import time
+from datetime import datetime
+
+from capture import CaptureEngine
+from discovery import discover_devices
+from wav_writer import StreamingWavWriter
+
+"""
+- arecord 프로세스 3개 대신 한 프로세스에서 모든 마이크 녹음
+- 콜백 버퍼마다 공통 monotonic 시계로 타임스탬프 기록
+- 가장 늦게 시작한 마이크 기준으로 앞부분을 잘라 모든 파일의 시작 시점을 맞춤
+  (시작 시각은 첫 ALIGN_SECONDS 동안 가장 이른 콜백 기준 추정값, capture.CaptureEngine.start_time / detect_ver4 와 같음)
+- 마이크별 잘라낸 샘플 수 / 타임스탬프 표는 recorded_index_{time}.json 에 저장
+- 파일 저장은 wav_writer.py (헤더 주기 갱신, 1시간 단위 분할)
+- 장치는 detect_ver4.MIC_IDENTIFIERS (USB 포트 / 시리얼) 로 찾음 (discovery.py), 비어 있으면 MIC_LOCATIONS 별칭 사용
+- 실행: python3 recorder.py (Ctrl+C 로 종료)
+"""
+
+# ALSA 장치 이름 (mic_setup.py 로 생성한 별칭), detect_ver4.MIC_IDENTIFIERS 가 비어 있을 때만 사용
+MIC_LOCATIONS = {
+    "left": "mic_3",
+    "middle": "mic_2",
+    "right": "mic_1"
+}
+
+RATE = 48000
+HOP = 1024
+RECORD_SECONDS = 1200
+TIMESTAMP_EVERY = 1.0  # 타임스탬프 표 간격 (초)
+WRITE_INTERVAL = 0.05  # 파일 쓰기 스레드 주기 (초)
+
+
+class MultiDeviceRecorder:
+    """ Records every device in one process into start-aligned WAV files plus a timing index """
+
+    def __init__(self, devices, rate=RATE, hop=HOP, backend="sounddevice", prefix="recorded",
+                 session_time=None):
+        self.devices = devices
+        self.rate = rate
+        self.session_time = session_time or datetime.now().strftime("%d_%m_%y_%H:%M:%S")
+        self.filenames = {mic: f"{prefix}_{mic}_{self.session_time}.wav" for mic in devices}
+        self.index_filename = f"{prefix}_index_{self.session_time}.json"
+
+        self.engine = CaptureEngine(devices, rate=rate, hop=hop, backend=backend)
+        self.engine.add_tap(self._stamp)
+        self.first_time = {}  # 마이크별 첫 샘플 시각 추정 (engine.start_time, 시작 구간이 모이면 확정)
+        self.timestamps = {mic: [] for mic in devices}  # [절대 샘플 위치, monotonic 시간]
+        self._received = {mic: 0 for mic in devices}
+        self._next_stamp = {mic: 0 for mic in devices}
+        self._stamp_step = int(rate * TIMESTAMP_EVERY)
+
+        self.trim = None
+        self.parts = {mic: [] for mic in devices}  # 분할된 파일 목록
+        self.written = {mic: 0 for mic in devices}
+        self._running = False
+        self._thread = None
+
+    def _stamp(self, mic, samples):
+        """ Capture-callback tap: time of the first sample of this buffer on the shared clock """
+        start = time.monotonic() - len(samples) / self.rate
+        pos = self._received[mic]
+        if pos >= self._next_stamp[mic]:
+            self.timestamps[mic].append((pos, start))
+            self._next_stamp[mic] = pos + self._stamp_step
+        self._received[mic] = pos + len(samples)
+
+    def start(self):
+        self._running = True
+        self.engine.start()
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    def _compute_trim(self):
+        reference = max(self.first_time.values())
+        return {mic: int(round((reference - t) * self.rate)) for mic, t in self.first_time.items()}
+
+    def _aligned(self):
+        return all(buf.write_pos >= self.engine.align_samples for buf in self.engine.buffers.values())
+
+    def _write_loop(self):
+        # 모든 장치의 시작 시각 추정 구간 (ALIGN_SECONDS) 이 들어올 때까지 대기
+        # (첫 콜백 하나는 수 ms 늦을 수 있음 -> 그 시각으로 자르면 파일 간 시간차 오차)
+        while self._running and not self._aligned():
+            time.sleep(WRITE_INTERVAL)
+        if not self._aligned():
+            return
+
+        self.first_time = dict(self.engine.start_time)
+        self.trim = self._compute_trim()
+        writers = {mic: StreamingWavWriter(filename, self.rate) for mic, filename in self.filenames.items()}
+        positions = dict(self.trim)
+
+        try:
+            while True:
+                running = self._running
+                for mic, buf in self.engine.buffers.items():
+                    pos = max(positions[mic], buf.oldest_pos())
+                    n = buf.write_pos - pos
+                    if n <= 0:
+                        continue
+                    samples = buf.read(pos, n)
+                    if samples is None:
+                        continue
+                    writers[mic].write(samples)
+                    positions[mic] = pos + n
+                    self.written[mic] += n
+                if not running:
+                    break
+                time.sleep(WRITE_INTERVAL)
+        finally:
+            for mic, writer in writers.items():
+                writer.close()
+                # 한 번도 쓰지 못하고 끝났으면 (첫 파일 생성 실패 등) 계획한 파일 이름 유지
+                if writer.filenames:
+                    self.filenames[mic] = writer.filenames[0]
+                self.parts[mic] = list(writer.filenames)
+
+    def stop(self):
+        self.engine.stop()
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.save_index()
+
+    def save_index(self):
+        """ Per-device sample offsets and timestamp table (file sample position -> monotonic time) """
+        if self.trim is None:
+            return
+        index = {
+            "rate": self.rate,
+            "session_time": self.session_time,
+            "reference_time": max(self.first_time.values()),
+            "devices": {
+                mic: {
+                    "device": str(self.devices[mic]),
+                    "filename": self.filenames[mic],
+                    "parts": self.parts[mic],
+                    "trimmed_samples": self.trim[mic],
+                    "first_buffer_time": self.first_time[mic],
+                    "samples_written": self.written[mic],
+                    "overflows": self.engine.overflows[mic],
+                    # 파일 샘플 위치 기준 (잘라낸 구간은 음수)
+                    "timestamps": [[pos - self.trim[mic], t] for pos, t in self.timestamps[mic]],
+                }
+                for mic in self.devices
+            },
+        }
+        with open(self.index_filename, "w") as f:
+            json.dump(index, f, indent=1)
+
+
+def find_devices(backend="sounddevice"):
+    """ Mic -> device via detect_ver4.MIC_IDENTIFIERS (same cards as the detector), else the ALSA aliases """
+    from detect_ver4 import MIC_IDENTIFIERS
+
+    if not MIC_IDENTIFIERS:
+        return MIC_LOCATIONS
+    return discover_devices(MIC_IDENTIFIERS, backend=backend)
+
+
+def main():
+    recorder = MultiDeviceRecorder(find_devices())
+    print("Start recording... (Ctrl+C to stop)")
+    for mic, filename in recorder.filenames.items():
+        print(f"Recording {mic} to {filename}...")
+
+    start = time.monotonic()
+    recorder.start()
+    try:
+        while time.monotonic() - start < RECORD_SECONDS and recorder.engine.is_active():
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        print("Recording stopped by user.")
+    finally:
+        recorder.stop()
+        print(f"All recordings saved. Index: {recorder.index_filename}")
+        if recorder.trim is not None:
+            print(f"Start alignment (trimmed samples): {recorder.trim}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import csv
+import time
+from datetime import datetime
+import numpy as np
+
+import detect_ver4 as live
+from pipeline import DetectionPipeline
+from session_reader import SessionReader
+from drift import DriftTracker
+
+"""
+- 녹음된 left_/middle_/right_*.wav 를 detect_ver4 와 같은 파이프라인으로 최대 속도 재생
+- 이벤트별 결과표(CSV) 저장 + 처리 속도(실시간 대비 배속) 출력
+- 임계값을 옵션으로 바꿔가며 하루치 녹음으로 튜닝 가능
+- --drift: 녹음에 남아 있는 클럭 드리프트를 detect_ver4 와 같은 방식으로 보정 (녹음 파일은 보정 전 원본)
+- 실행 예시:
+    python3 replay.py left_X.wav middle_X.wav right_X.wav
+    python3 replay.py --index recorded_index_X.json --onset-db 10
+"""
+
+COLUMNS = ["time", "status", "x", "y", "residual", "confidence", "quality", "mics"]
+
+
+def open_session(args):
+    if args.index:
+        return SessionReader.from_index(args.index)
+    if len(args.files) != len(live.MIC_POSITIONS):
+        raise SystemExit(f"WAV 파일 {len(live.MIC_POSITIONS)}개 필요 (순서: {', '.join(live.MIC_POSITIONS)})")
+    return SessionReader(dict(zip(live.MIC_POSITIONS, args.files)))
+
+
+def replay(reader, pipeline, chunk=live.CHUNK):
+    """ Run the pipeline over the whole session; returns (events, processed seconds, wall seconds) """
+    total = int(reader.duration() * reader.rate)
+    events = []
+    start = time.perf_counter()
+    for pos in range(0, total - chunk + 1, chunk):
+        window = reader.window(pos / reader.rate, (pos + chunk) / reader.rate)
+        signals = np.stack([window[mic] for mic in pipeline.mics]).astype(np.float32) / 32768.0
+        events.extend(pipeline.process(signals))
+    elapsed = time.perf_counter() - start
+    return events, (total // chunk) * chunk / reader.rate, elapsed
+
+
+def save_table(events, filename):
+    with open(filename, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        for event in events:
+            writer.writerow(dict(event, mics="/".join(event["mics"])))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("files", nargs="*", metavar="WAV", help="마이크별 WAV (MIC_POSITIONS 순서)")
+    parser.add_argument("--index", help="recorder.py 가 만든 recorded_index_*.json")
+    parser.add_argument("--out", help="결과 CSV 파일 이름")
+    parser.add_argument("--onset-db", type=float, default=live.ONSET_RATIO_DB)
+    parser.add_argument("--residual-threshold", type=float, default=live.RESIDUAL_THRESHOLD)
+    parser.add_argument("--quality-min", type=float, default=live.GCC_QUALITY_MIN)
+    parser.add_argument("--drift", action="store_true", help="클럭 드리프트 추정 / 보정")
+    args = parser.parse_args()
+
+    reader = open_session(args)
+    drift = DriftTracker(len(live.MIC_POSITIONS), reader.rate) if args.drift else None
+    pipeline = DetectionPipeline(live.MIC_POSITIONS, reader.rate, live.SOUND_SPEED, args.onset_db,
+                                 args.residual_threshold, args.quality_min, live.RECT_X_LIMIT, live.RECT_Y_LIMIT,
+                                 drift=drift)
+    events, audio_seconds, elapsed = replay(reader, pipeline)
+
+    out = args.out or f"replay_results_{datetime.now().strftime('%d_%m_%y_%H:%M:%S')}.csv"
+    save_table(events, out)
+
+    hits = sum(1 for e in events if e["status"] == "hit")
+    print(f"Replayed {audio_seconds:.1f} s of audio in {elapsed:.2f} s ({audio_seconds / max(elapsed, 1e-9):.0f}x real time)")
+    print(f"Events: {len(events)} (hits {hits}), saved to {out}")
+    if drift is not None:
+        print("Clock drift (ppm): " + ", ".join(f"{mic} {ppm:+.1f}" for mic, ppm in zip(pipeline.mics, drift.ppm())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import itertools
+import numpy as np
+
+import solver
+from tdoa import mic_pairs, relative_arrivals
+
+"""
+- 마이크 N개 (6~12개) 배열 지원
+- 쌍 줄이기: 마이크마다 가까운 이웃 NEIGHBORS 개와의 쌍만 GCC-PHAT 계산 (O(M^2) 방지)
+- RANSAC 방식: 마이크 3개 조합마다 위치를 한 번에(batch) 계산 -> 모든 쌍 시간차와 가장 잘 맞는 해 선택
+- 맞는 쌍(inlier)만으로 가중(상관 품질) Gauss-Newton 보정 -> 마이크 하나가 이상해도 결과가 망가지지 않음
+"""
+
+NEIGHBORS = 5             # 마이크당 쌍을 만들 최대 이웃 수
+MAX_HYPOTHESES = 200      # 3개 조합 최대 개수 (넘으면 무작위 추출)
+TDOA_TOLERANCE = 5e-5     # inlier 판단 시간차 오차 (초)
+REFINE_ITERATIONS = 5
+
+
+def select_pairs(mic_positions, mics=None, neighbors=NEIGHBORS):
+    """
+    mic_positions: (M, 2), mics: 사용할 마이크 번호 (기본 전체)
+    return: (P, 2) 마이크 번호 쌍 (i < j), 각 마이크는 가장 가까운 neighbors 개와 연결
+    """
+    mics = np.arange(len(mic_positions)) if mics is None else np.asarray(mics)
+    if len(mics) - 1 <= neighbors:
+        return mics[mic_pairs(len(mics))]
+
+    pos = np.asarray(mic_positions, dtype=np.float64)[mics]
+    dists = np.linalg.norm(pos[:, None] - pos[None], axis=2)
+    np.fill_diagonal(dists, np.inf)
+    nearest = np.argsort(dists, axis=1)[:, :neighbors]
+    rows = np.repeat(np.arange(len(mics)), neighbors)
+    local = np.sort(np.stack([rows, nearest.ravel()], axis=1), axis=1)
+    local = np.unique(local, axis=0)
+    return mics[local]
+
+
+def pair_predictions(positions, mic_positions, pairs, sound_speed):
+    """ (H, 2) candidate positions -> (H, P) predicted t_j - t_i """
+    dists = np.linalg.norm(positions[:, None, :] - mic_positions[None, :, :], axis=2)
+    return (dists[:, pairs[:, 1]] - dists[:, pairs[:, 0]]) / sound_speed
+
+
+def _hypotheses(pairs, num_mics, rng):
+    """ Mic triples (a, b, c) whose pairs (a, b) and (a, c) were both measured """
+    measured = np.zeros((num_mics, num_mics), dtype=bool)
+    measured[pairs[:, 0], pairs[:, 1]] = True
+    measured[pairs[:, 1], pairs[:, 0]] = True
+    used = np.unique(pairs)
+    triples = [t for t in itertools.combinations(used, 3) if measured[t[0], t[1]] and measured[t[0], t[2]]]
+    if len(triples) > MAX_HYPOTHESES:
+        keep = rng.choice(len(triples), MAX_HYPOTHESES, replace=False)
+        triples = [triples[k] for k in keep]
+    return np.array(triples, dtype=np.int64).reshape(-1, 3)
+
+
+def weighted_refine(guess, delays, weights, pairs, mic_positions, sound_speed, iterations=REFINE_ITERATIONS):
+    """ Weighted Gauss-Newton on pairwise range differences (single position) """
+    pos = guess.astype(np.float64).copy()
+    target = delays * sound_speed
+    sqrt_w = np.sqrt(weights)
+    for _ in range(iterations):
+        delta = pos - mic_positions
+        dists = np.maximum(np.linalg.norm(delta, axis=1), solver.EPS)
+        unit = delta / dists[:, None]
+        f = (dists[pairs[:, 1]] - dists[pairs[:, 0]] - target) * sqrt_w
+        jac = (unit[pairs[:, 1]] - unit[pairs[:, 0]]) * sqrt_w[:, None]
+        jtj = jac.T @ jac
+        step = np.linalg.solve(jtj + (1e-6 * np.trace(jtj) + solver.EPS) * np.eye(2), -jac.T @ f)
+        pos += step
+    return pos
+
+
+def robust_locate(delays, quality, pairs, mic_positions, sound_speed=solver.SOUND_SPEED,
+                  tolerance=TDOA_TOLERANCE, x_limit=solver.RECT_X_LIMIT, y_limit=solver.RECT_Y_LIMIT,
+                  clamp=True, seed=0):
+    """
+    delays / quality: (P,) gcc_phat 결과, pairs: (P, 2) 전체 마이크 번호
+    return: pos (2,), residual, inlier 마이크 번호 배열 (조합이 없으면 None)
+    """
+    mic_positions = np.asarray(mic_positions, dtype=np.float64)
+    triples = _hypotheses(pairs, len(mic_positions), np.random.default_rng(seed))
+    if len(triples) == 0:
+        return None
+
+    # 조합별 시간차 [0, t_b - t_a, t_c - t_a]
+    lookup = {(int(i), int(j)): k for k, (i, j) in enumerate(pairs)}
+
+    def delay(a, b):
+        return delays[lookup[(a, b)]] if a < b else -delays[lookup[(b, a)]]
+
+    time_diffs = np.array([[0.0, delay(a, b), delay(a, c)] for a, b, c in triples])
+    # 조합별 마이크 위치 (H, 3, 2) 로 모든 가설을 한 번에 계산
+    candidates = solver.solve(time_diffs, mic_positions[triples], sound_speed, x_limit, y_limit, clamp=False)[0]
+
+    # 모든 측정 쌍과 비교해 품질 가중 inlier 점수 계산
+    errors = np.abs(pair_predictions(candidates, mic_positions, pairs, sound_speed) - delays[None, :])
+    inlier = errors < tolerance
+    score = (inlier * quality[None, :]).sum(axis=1) - 1e-3 * np.where(inlier, errors, tolerance).sum(axis=1)
+    score[~np.isfinite(candidates).all(axis=1)] = -np.inf
+    best = int(np.argmax(score))
+
+    keep = inlier[best]
+    if keep.sum() < 2:
+        keep = np.ones(len(pairs), dtype=bool)
+    pos = weighted_refine(candidates[best], delays[keep], np.maximum(quality[keep], 1e-3), pairs[keep],
+                          mic_positions, sound_speed)
+    if not np.isfinite(pos).all():
+        pos = candidates[best]
+
+    # 기존과 같은 residual 을 inlier 마이크 기준으로 계산
+    inlier_mics = np.unique(pairs[keep])
+    local = np.searchsorted(inlier_mics, pairs[keep])
+    arrivals = relative_arrivals(delays[keep], local, len(inlier_mics))
+    residual = float(solver.residual_loss(pos[None, :], arrivals[None, :], mic_positions[inlier_mics], sound_speed)[0])
+
+    if clamp:
+        pos = np.array([np.clip(pos[0], *x_limit), np.clip(pos[1], *y_limit)])
+    return pos, residual, inlier_mics
@@ -0,0 +1,104 @@
+import numpy as np
+
+from onset import OnsetDetector, HOP_SIZE, ONSET_RATIO_DB
+
+"""
+- onset 주변만 잘라서 위치 추정 (100ms 청크 전체를 처리하지 않음)
+- 마이크별 짧은 pre-trigger 기록 유지
+- 한 마이크라도 onset 이 나오면 모든 마이크에서 같은 구간을 잘라냄
+  구간 = [onset - PRE_TRIGGER, onset + 최대 마이크 간 지연 + MARGIN + POST_TRIGGER)
+- 구간이 다음 청크로 넘어가면 다음 청크를 기다렸다가 잘라냄 -> 청크 경계에서 타격음이 나뉘지 않음
+- adopt(): 설정 변경(config.py)으로 새로 만든 segmenter 가 기존 stream 위치 / 잡음 바닥 / 최근 기록을 이어받음
+"""
+
+PRE_TRIGGER = 0.005   # 초
+POST_TRIGGER = 0.02   # 초
+MARGIN = 0.002        # 초
+
+
+class EventSegmenter:
+    """ Keeps a rolling multi-mic history and emits one aligned window per detected onset """
+
+    def __init__(self, num_mics, rate, max_tau, hop_size=HOP_SIZE, onset_ratio_db=ONSET_RATIO_DB,
+                 pre=PRE_TRIGGER, post=POST_TRIGGER, margin=MARGIN):
+        self.num_mics = num_mics
+        self.hop_size = hop_size
+        self.detector = OnsetDetector(num_mics, hop_size, onset_ratio_db)
+        self.pre = int(pre * rate)
+        self.span = int(np.ceil(max_tau * rate)) + int(margin * rate)  # 첫 onset 이후 다른 마이크 onset 허용 범위
+        self.length = self.pre + self.span + int(post * rate)
+        # 원형 버퍼 (hop 배수 크기) -> 매 hop 마다 기록을 밀어내는 복사 없음
+        self.capacity = (self.length // hop_size + 2) * hop_size
+        self.history = np.zeros((num_mics, self.capacity), dtype=np.float32)
+        self.end = 0  # history 마지막 샘플 다음의 절대 위치
+        self._carry = np.zeros((num_mics, 0), dtype=np.float32)
+        self._pending = None
+
+    def push(self, block):
+        """
+        block: (M, n) float32, 길이 자유
+        return: 완성된 이벤트 구간 목록 [{"trigger", "start", "onsets", "window"}]
+        """
+        block = np.asarray(block, dtype=np.float32)
+        if self._carry.shape[1]:
+            block = np.concatenate((self._carry, block), axis=1)
+
+        segments = []
+        usable = block.shape[1] - block.shape[1] % self.hop_size
+        for pos in range(0, usable, self.hop_size):
+            hop = block[:, pos:pos + self.hop_size]
+            index = self.end % self.capacity
+            self.history[:, index:index + self.hop_size] = hop
+            self.end += self.hop_size
+
+            onsets, _ = self.detector.process_hop(hop)
+            self._update_pending(onsets)
+
+            if self._pending is not None and self.end >= self._pending["start"] + self.length:
+                segments.append(self._cut())
+
+        self._carry = block[:, usable:].copy()
+        return segments
+
+    def adopt(self, old):
+        """ Continue another segmenter's stream (position, noise floors, recent history) with this one's sizes """
+        if old.num_mics != self.num_mics or old.hop_size != self.hop_size:
+            raise ValueError("마이크 수 / hop 크기가 다른 segmenter 는 이어받을 수 없습니다")
+        old.detector.ratio = self.detector.ratio
+        self.detector = old.detector
+        self.end = old.end
+        self._carry = old._carry
+        # 최근 기록을 새 원형 버퍼의 같은 절대 위치로 복사
+        kept = min(self.capacity, old.capacity, old.end)
+        positions = np.arange(self.end - kept, self.end)
+        self.history[:, positions % self.capacity] = old.history[:, positions % old.capacity]
+        pending = old._pending
+        # 진행 중인 구간은 시작점이 복사한 기록 안에 있을 때만 유지 (onset 허용 범위는 새 span 기준)
+        self._pending = pending if pending is not None and pending["start"] >= self.end - kept else None
+
+    def _update_pending(self, onsets):
+        hit = onsets >= 0
+        if not hit.any():
+            return
+        if self._pending is None:
+            trigger = int(onsets[hit].min())
+            self._pending = {
+                "trigger": trigger,
+                "start": trigger - self.pre,
+                "onsets": np.full(self.num_mics, -1, dtype=np.int64),
+            }
+        pending = self._pending
+        # 첫 onset 이후 span 안에 들어온 onset 만 같은 타격으로 봄
+        late = hit & (onsets <= pending["trigger"] + self.span) & (pending["onsets"] < 0)
+        pending["onsets"][late] = onsets[late]
+
+    def _cut(self):
+        pending = self._pending
+        self._pending = None
+        # end - start 는 항상 [length, length + hop) 이므로 구간 전체가 history 안에 있음
+        index = pending["start"] % self.capacity
+        if index + self.length <= self.capacity:
+            pending["window"] = self.history[:, index:index + self.length].copy()
+        else:
+            pending["window"] = np.take(self.history, np.arange(index, index + self.length), axis=1, mode="wrap")
+        return pending
@@ -0,0 +1,151 @@
+import glob
+import json
+import os
+import struct
+import numpy as np
+
+"""
+- 긴 녹음 파일을 memory-map 으로 열어 필요한 구간만 읽음 (전체 디코딩 없음)
+- 마이크별 WAV 3개 / recorder.py index / 다채널 WAV 하나 모두 지원
+- 시간 구간을 주면 마이크별 int16 view 반환 (복사 없음, 페이지 폴트만 발생)
+"""
+
+
+class WavMap:
+    """ Memory-mapped 16-bit PCM WAV file """
+
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, "rb") as f:
+            riff, _, wave_id = struct.unpack("<4sI4s", f.read(12))
+            if riff != b"RIFF" or wave_id != b"WAVE":
+                raise ValueError(f"{filename}: WAV 파일이 아닙니다")
+
+            fmt = None
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    raise ValueError(f"{filename}: data 청크가 없습니다")
+                chunk_id, size = struct.unpack("<4sI", header)
+                if chunk_id == b"fmt ":
+                    fmt = struct.unpack("<HHIIHH", f.read(16))
+                    f.seek(size - 16 + (size & 1), 1)
+                elif chunk_id == b"data":
+                    data_offset = f.tell()
+                    data_size = size
+                    break
+                else:
+                    f.seek(size + (size & 1), 1)
+
+        if fmt is None or fmt[0] != 1 or fmt[5] != 16:
+            raise ValueError(f"{filename}: 16-bit PCM 만 지원합니다")
+        self.channels = fmt[1]
+        self.rate = fmt[2]
+
+        # 헤더 갱신 전에 종료된 파일(크기 0 또는 실제보다 큼)은 파일 크기로 계산
+        available = os.path.getsize(filename) - data_offset
+        if data_size == 0 or data_size > available:
+            data_size = available
+        self.frames = data_size // (2 * self.channels)
+        self.data = np.memmap(filename, dtype="<i2", mode="r", offset=data_offset,
+                              shape=(self.frames, self.channels))
+
+
+class SessionReader:
+    """ Time-aligned random access into a recorded multi-mic session """
+
+    def __init__(self, files, offsets=None):
+        """
+        files: {mic: 파일 경로 또는 분할 파일 목록}
+        offsets: {mic: 샘플} 각 파일 시작이 기준 시점보다 늦은 만큼 (기본 0)
+        """
+        self.parts = {}
+        self.channel = {}
+        for mic, paths in files.items():
+            paths = [paths] if isinstance(paths, str) else list(paths)
+            self.parts[mic] = [WavMap(p) for p in paths]
+            self.channel[mic] = 0
+
+        rates = {w.rate for parts in self.parts.values() for w in parts}
+        if len(rates) != 1:
+            raise ValueError(f"샘플링 레이트가 서로 다릅니다: {rates}")
+        self.rate = rates.pop()
+        self.mics = list(self.parts)
+        self.offsets = {mic: 0 for mic in self.mics}
+        if offsets:
+            self.offsets.update(offsets)
+        self._starts = {mic: np.cumsum([0] + [w.frames for w in parts]) for mic, parts in self.parts.items()}
+
+    @classmethod
+    def from_index(cls, index_path):
+        """ Open a session written by recorder.py (files are already start-aligned) """
+        with open(index_path) as f:
+            index = json.load(f)
+        base = os.path.dirname(os.path.abspath(index_path))
+        files = {mic: [os.path.join(base, p) for p in (d.get("parts") or [d["filename"]])]
+                 for mic, d in index["devices"].items()}
+        return cls(files)
+
+    @classmethod
+    def from_session(cls, session_time, mics=("left", "middle", "right"), prefix="recorded", directory="."):
+        """ recorded_{mic}_{time}.wav (and rotated _001, _002 ... parts) """
+        files = {}
+        for mic in mics:
+            first = os.path.join(directory, f"{prefix}_{mic}_{session_time}.wav")
+            rest = sorted(glob.glob(os.path.join(directory, f"{prefix}_{mic}_{session_time}_[0-9][0-9][0-9].wav")))
+            files[mic] = [first] + rest
+        return cls(files)
+
+    @classmethod
+    def from_multichannel(cls, filename, mics):
+        """ One interleaved WAV, channel i = mics[i] """
+        reader = cls({mics[0]: filename})
+        reader.parts = {mic: reader.parts[mics[0]] for mic in mics}
+        reader.channel = {mic: i for i, mic in enumerate(mics)}
+        reader.mics = list(mics)
+        reader.offsets = {mic: 0 for mic in mics}
+        reader._starts = {mic: reader._starts[mics[0]] for mic in mics}
+        return reader
+
+    def frames(self, mic):
+        return int(self._starts[mic][-1]) + self.offsets[mic]
+
+    def duration(self):
+        return min(self.frames(mic) for mic in self.mics) / self.rate
+
+    def _slice(self, mic, start, stop):
+        """ Samples [start, stop) of the session timeline, zero-padded outside the recording """
+        start -= self.offsets[mic]
+        stop -= self.offsets[mic]
+        starts = self._starts[mic]
+        total = int(starts[-1])
+        lo, hi = max(start, 0), min(stop, total)
+        ch = self.channel[mic]
+
+        part = int(np.searchsorted(starts, lo, side="right")) - 1 if lo < total else -1
+        if 0 <= part and hi <= starts[part + 1] and lo == start and hi == stop:
+            # 한 파일 안의 구간 -> 복사 없는 view
+            base = int(starts[part])
+            return self.parts[mic][part].data[lo - base:hi - base, ch]
+
+        out = np.zeros(max(stop - start, 0), dtype=np.int16)
+        pos = lo
+        while pos < hi:
+            part = int(np.searchsorted(starts, pos, side="right")) - 1
+            base, end = int(starts[part]), int(min(starts[part + 1], hi))
+            out[pos - start:end - start] = self.parts[mic][part].data[pos - base:end - base, ch]
+            pos = end
+        return out
+
+    def window(self, t0, t1):
+        """ {mic: int16 samples} for session time [t0, t1) seconds """
+        start, stop = int(round(t0 * self.rate)), int(round(t1 * self.rate))
+        return {mic: self._slice(mic, start, stop) for mic in self.mics}
+
+    def window_around(self, t, before=0.025, after=0.025):
+        """ e.g. 50 ms window around a logged hit """
+        return self.window(t - before, t + after)
+
+    def array(self, t0, t1):
+        """ (M, n) float32 copy in mics order, ready for tdoa.gcc_phat """
+        return np.stack([w.astype(np.float32) / 32768.0 for w in self.window(t0, t1).values()])
@@ -0,0 +1,142 @@
+import numpy as np
+
+"""
+- scipy Nelder-Mead 대신 닫힌 해(구면 교차 / Chan) + Gauss-Newton 보정
+- 이벤트당 비용 고정 (반복 횟수 고정, scipy 호출 없음)
+- 여러 이벤트를 (N, M) 배열로 한 번에 처리 가능 (마이크 위치도 이벤트별 (N, M, 2) 가능)
+- Residual 은 기존 loss (arrivals - arrivals.min() 기준 제곱합)와 동일하게 계산
+- 결과 좌표는 RECT_X_LIMIT / RECT_Y_LIMIT 범위로 clamp (detect_ver3 와 동일)
+"""
+
+SOUND_SPEED = 343000  # mm/s
+RECT_X_LIMIT = (0, 400)  # mm
+RECT_Y_LIMIT = (0, 1000)  # mm
+GN_ITERATIONS = 5
+EPS = 1e-9
+
+
+def _per_event(mic_positions):
+    """ (M, 2) -> (1, M, 2) so it broadcasts against (N, ...) ; (N, M, 2) unchanged """
+    return mic_positions if mic_positions.ndim == 3 else mic_positions[None, :, :]
+
+
+def residual_loss(positions, time_diffs, mic_positions, sound_speed=SOUND_SPEED):
+    """ Same loss as estimate_impact_location in detect_ver3 / ver6, for (N, 2) positions at once """
+    dists = np.linalg.norm(_per_event(mic_positions) - positions[:, None, :], axis=2)
+    arrivals = dists / sound_speed
+    relative = arrivals - arrivals.min(axis=1, keepdims=True)
+    return np.sum((relative - time_diffs) ** 2, axis=1)
+
+
+def within_rect(pos, x_limit=RECT_X_LIMIT, y_limit=RECT_Y_LIMIT):
+    """ ver6 직사각형 필터 """
+    pos = np.asarray(pos)
+    return (x_limit[0] <= pos[..., 0]) & (pos[..., 0] <= x_limit[1]) & \
+           (y_limit[0] <= pos[..., 1]) & (pos[..., 1] <= y_limit[1])
+
+
+def closed_form(range_diffs, mic_positions, x_limit=RECT_X_LIMIT, y_limit=RECT_Y_LIMIT):
+    """
+    구면 교차(spherical intersection) 초기해
+    range_diffs: (N, M) 마이크 0 기준 거리차 (mm), mic_positions: (M, 2) 또는 (N, M, 2)
+    return: (N, 2) 초기 좌표 (해가 없으면 마이크 중심)
+    """
+    n = len(range_diffs)
+    mp = np.broadcast_to(_per_event(mic_positions), (n,) + mic_positions.shape[-2:])
+    p0 = mp[:, 0, :]
+    d = range_diffs[:, 1:]
+
+    # 2 (p_i - p_0) . x + 2 d_i R0 = |p_i|^2 - |p_0|^2 - d_i^2
+    a = np.empty((n, d.shape[1], 3))
+    a[:, :, :2] = 2 * (mp[:, 1:, :] - p0[:, None, :])
+    a[:, :, 2] = 2 * d
+    b = (mp[:, 1:, :] ** 2).sum(axis=2) - (p0 ** 2).sum(axis=1)[:, None] - d ** 2
+
+    centroid = mp.mean(axis=1)
+    if d.shape[1] < 2:
+        return centroid.copy()
+
+    # 상위 2개 특이벡터 공간에서 특수해, 가장 작은 특이벡터 방향으로 R0 제약을 만족시킴
+    u, s, vt = np.linalg.svd(a, full_matrices=True)
+    coef = np.einsum("nmk,nm->nk", u[:, :, :2], b) / np.maximum(s[:, :2], EPS)
+    u_p = np.einsum("nk,nkj->nj", coef, vt[:, :2, :])
+    null = vt[:, 2, :]
+
+    # |xy(z) - p0|^2 = R0(z)^2 -> z 에 대한 2차 방정식
+    base = u_p[:, :2] - p0
+    e = null[:, :2]
+    qa = (e ** 2).sum(axis=1) - null[:, 2] ** 2
+    qb = 2 * ((base * e).sum(axis=1) - u_p[:, 2] * null[:, 2])
+    qc = (base ** 2).sum(axis=1) - u_p[:, 2] ** 2
+
+    disc = np.maximum(qb ** 2 - 4 * qa * qc, 0.0)
+    linear = np.abs(qa) < EPS
+    safe_qa = np.where(linear, 1.0, qa)
+    safe_qb = np.where(np.abs(qb) < EPS, EPS, qb)
+    z1 = np.where(linear, -qc / safe_qb, (-qb + np.sqrt(disc)) / (2 * safe_qa))
+    z2 = np.where(linear, z1, (-qb - np.sqrt(disc)) / (2 * safe_qa))
+
+    candidates = u_p[:, None, :] + np.stack([z1, z2], axis=1)[:, :, None] * null[:, None, :]
+    xy = candidates[:, :, :2]
+
+    # R0 >= 0 이고 사각형 안쪽인 해를 우선 선택
+    penalty = (candidates[:, :, 2] < 0) * 2.0 + (~within_rect(xy, x_limit, y_limit)) * 1.0
+    dist = np.linalg.norm(xy - centroid[:, None, :], axis=2)
+    best = np.argmin(penalty * 1e9 + dist, axis=1)
+    guess = xy[np.arange(n), best]
+
+    degenerate = (s[:, 1] < EPS * np.maximum(s[:, 0], 1.0)) | ~np.isfinite(guess).all(axis=1)
+    guess[degenerate] = centroid[degenerate]
+    return guess
+
+
+def gauss_newton(guess, range_diffs, mic_positions, iterations=GN_ITERATIONS):
+    """ Fixed-count damped Gauss-Newton refinement with analytic Jacobian, (N, 2) at once """
+    pos = guess.copy()
+    mp = _per_event(mic_positions)
+    eye = np.eye(2)
+    for _ in range(iterations):
+        delta = pos[:, None, :] - mp
+        dists = np.maximum(np.linalg.norm(delta, axis=2), EPS)
+        unit = delta / dists[:, :, None]
+
+        f = dists - dists[:, :1] - range_diffs          # (N, M)
+        jac = unit - unit[:, :1, :]                       # (N, M, 2)
+
+        jtj = np.einsum("nmi,nmj->nij", jac, jac)
+        jtf = np.einsum("nmi,nm->ni", jac, f)
+        damping = 1e-6 * np.trace(jtj, axis1=1, axis2=2)[:, None, None] + EPS
+        step = np.linalg.solve(jtj + damping * eye, -jtf[:, :, None])[:, :, 0]
+        pos += step
+    return pos
+
+
+def solve(time_diffs, mic_positions, sound_speed=SOUND_SPEED,
+          x_limit=RECT_X_LIMIT, y_limit=RECT_Y_LIMIT, clamp=True):
+    """
+    time_diffs: (N, M) 도달 시간차 (초), mic_positions: (M, 2) 또는 이벤트별 (N, M, 2) mm
+    return: (N, 2) 좌표, (N,) residual
+    """
+    time_diffs = np.atleast_2d(np.asarray(time_diffs, dtype=np.float64))
+    mic_positions = np.asarray(mic_positions, dtype=np.float64)
+
+    range_diffs = (time_diffs - time_diffs[:, :1]) * sound_speed
+    guess = closed_form(range_diffs, mic_positions, x_limit, y_limit)
+    pos = gauss_newton(guess, range_diffs, mic_positions)
+
+    # GN 이 발산하면 초기해 사용
+    bad = ~np.isfinite(pos).all(axis=1)
+    pos[bad] = guess[bad]
+
+    residual = residual_loss(pos, time_diffs, mic_positions, sound_speed)
+    if clamp:
+        pos[:, 0] = np.clip(pos[:, 0], x_limit[0], x_limit[1])
+        pos[:, 1] = np.clip(pos[:, 1], y_limit[0], y_limit[1])
+    return pos, residual
+
+
+def estimate_impact_location(time_diffs, mic_positions, sound_speed=SOUND_SPEED,
+                             x_limit=RECT_X_LIMIT, y_limit=RECT_Y_LIMIT, clamp=True):
+    """ Drop-in replacement for the Nelder-Mead estimate_impact_location (one event) """
+    pos, residual = solve(time_diffs, mic_positions, sound_speed, x_limit, y_limit, clamp)
+    return pos[0], float(residual[0])
@@ -0,0 +1,145 @@
+import json
+import os
+import random
+import socket
+import threading
+
+from protocol import (MSG_HIT, MSG_REPLAY, MSG_WELCOME, ProtocolError, decode, encode_subscribe, recv_frame)
+
+"""
+- broadcast.py 방송 수신용 재연결 클라이언트 (mic_client, 점수판 등)
+- 연결이 끊기면 지수 백오프 (BACKOFF_MIN 부터 2배씩, 최대 BACKOFF_MAX, 지터 포함) 로 재연결
+- 재연결 시 SUBSCRIBE 로 (서버 세션, 마지막으로 처리한 seq) 전송 -> 서버 링 버퍼에서 놓친 HIT 를 REPLAY 로 한 번에 받음
+- 같은 seq 는 한 번만 on_hit 호출, 서버 링 버퍼보다 오래 끊겼거나 느려서 버려진 HIT 는 missed 로 셈
+- state_file 을 주면 (세션, seq) 를 파일에 저장 -> 클라이언트를 다시 켜도 이어받음
+- heartbeat 가 heartbeat_timeout 동안 없으면 끊긴 것으로 보고 재연결
+"""
+
+HEARTBEAT_TIMEOUT = 5.0
+CONNECT_TIMEOUT = 5.0
+BACKOFF_MIN = 0.5   # 초
+BACKOFF_MAX = 30.0
+
+
+class HitSubscriber:
+    """ Reconnecting HIT subscriber that resumes after the last seq it handled """
+
+    def __init__(self, host, port, on_hit, state_file=None, on_status=None, heartbeat_timeout=HEARTBEAT_TIMEOUT):
+        # on_hit(hit): hit = protocol.decode() dict + "replayed" (재접속 후 몰아서 받은 것이면 True)
+        # on_status(text): 연결 / 재연결 / 누락 안내 (None 이면 출력 없음)
+        self.host = host
+        self.port = port
+        self.on_hit = on_hit
+        self.on_status = on_status
+        self.state_file = state_file
+        self.heartbeat_timeout = heartbeat_timeout
+        self.session = 0
+        self.last_seq = 0
+        self.received = 0
+        self.replayed = 0
+        self.missed = 0
+        self.connects = 0
+        self._sock = None
+        self._stop = threading.Event()
+        if state_file and os.path.exists(state_file):
+            with open(state_file) as f:
+                state = json.load(f)
+            self.session, self.last_seq = state["session"], state["seq"]
+
+    def run(self):
+        """ Receive until stop() (blocking) """
+        delay = BACKOFF_MIN
+        while not self._stop.is_set():
+            try:
+                sock = socket.create_connection((self.host, self.port), timeout=CONNECT_TIMEOUT)
+            except OSError as e:
+                self._status(f"server check (Cant Connected to Server: {e})")
+            else:
+                self._sock = sock
+                try:
+                    sock.settimeout(self.heartbeat_timeout)
+                    sock.sendall(encode_subscribe(self.session, self.last_seq))
+                    self._welcome(*recv_frame(sock))
+                    delay = BACKOFF_MIN
+                    self._receive(sock)
+                except (OSError, ConnectionError, ProtocolError) as e:
+                    if not self._stop.is_set():
+                        self._status(f"Connection lost: {e}")
+                finally:
+                    self._sock = None
+                    sock.close()
+            if self._stop.is_set():
+                break
+            wait = delay * random.uniform(0.5, 1.0)
+            self._status(f"Reconnecting in {wait:.1f} seconds...")
+            self._stop.wait(wait)
+            delay = min(delay * 2, BACKOFF_MAX)
+
+    def stop(self):
+        self._stop.set()
+        self.drop()
+
+    def drop(self):
+        """ Close the current connection; run() reconnects and resumes (also used by loopback_test) """
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _status(self, text):
+        if self.on_status is not None:
+            self.on_status(text)
+
+    def _welcome(self, kind, payload):
+        if kind != MSG_WELCOME:
+            raise ProtocolError(f"expected WELCOME, got kind {kind}")
+        welcome = decode(kind, payload)
+        self.connects += 1
+        if welcome["session"] != self.session:
+            # 처음 접속이면 지금부터, 서버가 재시작됐으면 새 세션의 처음부터 (REPLAY 로 옴)
+            self.last_seq = welcome["last_seq"] if not self.session else 0
+            self.session = welcome["session"]
+        elif welcome["first_seq"] > self.last_seq + 1:
+            # 서버 링 버퍼보다 오래 끊김
+            self.missed += welcome["first_seq"] - self.last_seq - 1
+            self._status(f"({welcome['first_seq'] - self.last_seq - 1} events missed while disconnected)")
+            # 빈틈은 여기서 한 번만 셈 (REPLAY 첫 HIT 에서 다시 세지 않도록)
+            self.last_seq = welcome["first_seq"] - 1
+        self._status("Connected to server!" if self.connects == 1 else f"Reconnected, resuming after seq {self.last_seq}")
+        self._save()
+
+    def _receive(self, sock):
+        while not self._stop.is_set():
+            kind, payload = recv_frame(sock)
+            if kind == MSG_HIT:
+                self._handle(decode(kind, payload), False)
+            elif kind == MSG_REPLAY:
+                hits = decode(kind, payload)["hits"]
+                for hit in hits:
+                    self._handle(hit, True)
+                self._status(f"Caught up on {len(hits)} events")
+            else:
+                continue
+            self._save()
+
+    def _handle(self, hit, replayed):
+        if hit["seq"] <= self.last_seq:
+            return
+        if self.last_seq and hit["seq"] > self.last_seq + 1:
+            self.missed += hit["seq"] - self.last_seq - 1
+            self._status(f"({hit['seq'] - self.last_seq - 1} events missed)")
+        self.last_seq = hit["seq"]
+        self.received += 1
+        self.replayed += replayed
+        hit["replayed"] = replayed
+        self.on_hit(hit)
+
+    def _save(self):
+        if not self.state_file:
+            return
+        tmp = self.state_file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"session": self.session, "seq": self.last_seq}, f)
+        os.replace(tmp, self.state_file)
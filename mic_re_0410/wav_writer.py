@@ -0,0 +1,165 @@
+import os
+import queue
+import struct
+import threading
+import time
+import numpy as np
+
+"""
+- 녹음 데이터를 메모리에 모으지 않고 백그라운드 스레드로 바로 파일에 int16 저장
+- WAV 헤더를 주기적으로 갱신 -> 프로세스가 강제 종료돼도 그때까지 녹음된 파일은 재생 가능
+- 크기 / 시간 기준 파일 분할 (name.wav, name_001.wav, name_002.wav ...)
+- FLAC 저장은 soundfile 패키지가 설치된 경우에만 사용 가능
+"""
+
+PATCH_INTERVAL = 1.0      # WAV 헤더 갱신 주기 (초)
+MAX_SECONDS = 3600        # 파일 하나 최대 길이 (초), None 이면 WAV 한계 (4 GiB) 에서만 분할
+MAX_BYTES = None          # 파일 하나 최대 크기 (byte)
+QUEUE_SIZE = 1000         # 대기 블록 수 (100ms 블록 기준 100초)
+HEADER_SIZE = 44
+
+
+def wav_header(rate, channels, data_bytes):
+    """ 44-byte PCM 16-bit WAV header """
+    return struct.pack("<4sI4s4sIHHIIHH4sI",
+                       b"RIFF", 36 + data_bytes, b"WAVE",
+                       b"fmt ", 16, 1, channels, rate, rate * channels * 2, channels * 2, 16,
+                       b"data", data_bytes)
+
+
+class StreamingWavWriter:
+    """ Appends int16 frames to disk from a background thread, with header patching and rotation """
+
+    def __init__(self, filename, rate, channels=1, max_seconds=MAX_SECONDS, max_bytes=MAX_BYTES,
+                 patch_interval=PATCH_INTERVAL, fmt="wav"):
+        self.base, ext = os.path.splitext(filename)
+        self.ext = ext or f".{fmt}"
+        self.rate = rate
+        self.channels = channels
+        self.fmt = fmt
+        self.patch_interval = patch_interval
+
+        frame_bytes = 2 * channels
+        # WAV 크기 필드는 32bit -> 분할 설정이 없어도 4 GiB 를 넘기 전에 새 파일
+        limits = [(2 ** 32 - 1 - HEADER_SIZE) // frame_bytes]
+        if max_seconds:
+            limits.append(int(max_seconds * rate))
+        if max_bytes:
+            limits.append((max_bytes - HEADER_SIZE) // frame_bytes)
+        self.max_frames = min(limits)
+
+        self.filenames = []
+        self.frames_written = 0  # 전체 누적 프레임 수
+        self.dropped_blocks = 0
+        self.error = None  # 쓰기 스레드가 죽은 원인 (디스크 가득 참, 쓸 수 없는 경로 등)
+        self._queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self._file = None
+        self._file_frames = 0
+        self._last_patch = 0.0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, samples):
+        """ Queue a copy of an int16 block (n,) or (n, channels); never blocks the caller """
+        if not self._thread.is_alive():
+            self.dropped_blocks += 1
+            return
+        try:
+            # 호출자가 버퍼를 재사용할 수 있도록 복사본을 넣음
+            self._queue.put_nowait(np.array(samples, dtype=np.int16))
+        except queue.Full:
+            self.dropped_blocks += 1
+
+    def close(self):
+        """ Flush and stop the writer thread; does not hang if it already died (see error) """
+        while self._thread.is_alive():
+            try:
+                self._queue.put(None, timeout=0.5)
+                break
+            except queue.Full:
+                pass  # 살아 있으면 (느린 디스크) 계속 대기, 죽었으면 루프 종료
+        self._thread.join()
+        if self.error is not None:
+            # 남은 블록도 누락으로 셈 (종료 표시 None 제외)
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                self.dropped_blocks += item is not None
+
+    def _next_filename(self):
+        index = len(self.filenames)
+        return f"{self.base}{self.ext}" if index == 0 else f"{self.base}_{index:03d}{self.ext}"
+
+    def _open(self):
+        filename = self._next_filename()
+        self.filenames.append(filename)
+        if self.fmt == "flac":
+            import soundfile as sf
+            self._file = sf.SoundFile(filename, mode="w", samplerate=self.rate, channels=self.channels,
+                                      format="FLAC", subtype="PCM_16")
+        else:
+            self._file = open(filename, "wb")
+            self._file.write(wav_header(self.rate, self.channels, 0))
+        self._file_frames = 0
+        self._last_patch = time.monotonic()
+
+    def _patch_header(self):
+        if self.fmt == "flac":
+            self._file.flush()
+            return
+        pos = self._file.tell()
+        self._file.seek(0)
+        self._file.write(wav_header(self.rate, self.channels, self._file_frames * 2 * self.channels))
+        self._file.seek(pos)
+        self._file.flush()
+        self._last_patch = time.monotonic()
+
+    def _close_file(self):
+        if self._file is None:
+            return
+        self._patch_header()
+        self._file.close()
+        self._file = None
+
+    def _append(self, block):
+        frames = block.reshape(-1, self.channels) if self.channels > 1 else block.reshape(-1)
+        while len(frames):
+            if self._file is None:
+                self._open()
+            room = self.max_frames - self._file_frames
+            part, frames = frames[:room], frames[room:]
+            if self.fmt == "flac":
+                self._file.write(part)
+            else:
+                self._file.write(part.tobytes())
+            self._file_frames += len(part)
+            self.frames_written += len(part)
+            if self._file_frames >= self.max_frames:
+                self._close_file()
+
+    def _run(self):
+        block = False
+        try:
+            while True:
+                try:
+                    block = self._queue.get(timeout=self.patch_interval)
+                except queue.Empty:
+                    block = False
+                if block is None:
+                    break
+                if block is not False:
+                    self._append(block)
+                    block = False
+                if self._file is not None and time.monotonic() - self._last_patch >= self.patch_interval:
+                    self._patch_header()
+        except Exception as e:
+            self.error = e
+            if block is not False:
+                self.dropped_blocks += 1  # 쓰는 중 실패한 블록
+        finally:
+            try:
+                self._close_file()
+            except OSError as e:
+                self.error = self.error or e
@@ -0,0 +1,131 @@
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mic_re_0410"))
+
+from broadcast import HitBroadcaster
+from protocol import MSG_HIT, decode, encode_subscribe, recv_frame
+from subscriber import HitSubscriber
+
+"""
+- 장비 / 네트워크 없이 127.0.0.1 에서 방송 서버 확인
+- 빠른 클라이언트 N개 + 일부러 느린 클라이언트 1개 연결 후 합성 타격 이벤트 전송
+- 확인 항목: 빠른 클라이언트는 전부 수신, 느린 클라이언트는 오래된 것만 버려짐, publish() 는 멈추지 않음
+- 재접속 클라이언트 (subscriber.py) 는 1/3 지점에서 연결을 끊었다가 다시 붙음 -> 모든 seq 를 정확히 한 번씩 받아야 함
+- 출력: publish 호출 시간 (최대), 클라이언트별 수신 / 누락 수, 전송 지연 p50 / p99
+- 실행: python3 loopback_test.py [--clients 4] [--events 20000] [--rate 2000]
+"""
+
+def run_client(port, results, name, delay, stop, target):
+    sock = socket.create_connection(("127.0.0.1", port))
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    sock.settimeout(2)
+    sock.sendall(encode_subscribe())  # 실시간만 (이어받기 없음)
+    received, missed, latencies = 0, 0, []
+    last_seq = 0
+    try:
+        while not stop.is_set():
+            kind, payload = recv_frame(sock)
+            if kind != MSG_HIT:
+                continue
+            hit = decode(kind, payload)
+            latencies.append(time.time() - hit["t"])
+            missed += hit["seq"] - last_seq - 1
+            last_seq = hit["seq"]
+            received += 1
+            if last_seq >= target:
+                break
+            if delay:
+                time.sleep(delay)
+    except (socket.timeout, ConnectionError):
+        pass
+    finally:
+        sock.close()
+    results[name] = (received, missed, last_seq, sorted(latencies))
+
+def run_resume_client(port, results, target):
+    seqs, latencies = [], []
+
+    def on_hit(hit):
+        seqs.append(hit["seq"])
+        latencies.append(time.time() - hit["t"])
+        if hit["seq"] == target // 3:
+            subscriber.drop()  # 일부러 끊음 -> 백오프 후 재접속 + REPLAY
+        if hit["seq"] >= target:
+            subscriber.stop()
+
+    subscriber = HitSubscriber("127.0.0.1", port, on_hit, heartbeat_timeout=2)
+    subscriber.run()
+    results["resume"] = (seqs, subscriber.replayed, subscriber.connects, sorted(latencies))
+
+def percentile(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--rate", type=float, default=2000, help="초당 이벤트 수")
+    parser.add_argument("--queue-size", type=int, default=256)
+    args = parser.parse_args()
+
+    server = HitBroadcaster("127.0.0.1", 0, args.queue_size).start()
+    results, stop = {}, threading.Event()
+    # 느린 클라이언트는 초당 500개만 읽음
+    clients = [(f"fast_{i}", 0.0) for i in range(args.clients)] + [("slow", 0.002)]
+    threads = [threading.Thread(target=run_client, args=(server.port, results, name, delay, stop, args.events))
+               for name, delay in clients]
+    threads.append(threading.Thread(target=run_resume_client, args=(server.port, results, args.events)))
+    for t in threads:
+        t.start()
+    while server.stats()["clients"] < len(threads):
+        time.sleep(0.01)
+
+    event = {"x": 123.4, "y": 567.8, "confidence": 95.0, "residual": 1e-6, "status": "hit"}
+    calls = []
+    start = time.perf_counter()
+    for k in range(args.events):
+        t0 = time.perf_counter()
+        server.publish(event)
+        calls.append(time.perf_counter() - t0)
+        delay = start + (k + 1) / args.rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    elapsed = time.perf_counter() - start
+
+    # 모든 클라이언트가 마지막 seq 까지 읽을 때까지 대기 (최대 30초)
+    deadline = time.monotonic() + 30
+    for t in threads:
+        t.join(max(0.0, deadline - time.monotonic()))
+    stop.set()
+    for t in threads:
+        t.join()
+    server.stop()
+
+    calls.sort()
+    print(f"published {args.events} events in {elapsed:.2f} s, publish() p50 {percentile(calls, 0.5) * 1e6:.1f} us, "
+          f"p99 {percentile(calls, 0.99) * 1e6:.1f} us, max {calls[-1] * 1e3:.2f} ms")
+    ok = True
+    for name, _ in clients:
+        received, missed, last_seq, lat = results.get(name, (0, 0, 0, []))
+        print(f"  {name:<8} received {received:6d}  missed {missed:6d}  last seq {last_seq:6d}  "
+              f"latency p50 {percentile(lat, 0.5) * 1e3:7.2f} ms  p99 {percentile(lat, 0.99) * 1e3:7.2f} ms")
+        if name != "slow" and received != args.events:
+            ok = False
+        if name == "slow" and last_seq != args.events:
+            ok = False  # 느린 클라이언트도 최신 이벤트까지는 받아야 함
+    seqs, replayed, connects, lat = results.get("resume", ([], 0, 0, []))
+    print(f"  {'resume':<8} received {len(seqs):6d}  replayed {replayed:6d}  connects {connects}  "
+          f"latency p50 {percentile(lat, 0.5) * 1e3:7.2f} ms  p99 {percentile(lat, 0.99) * 1e3:7.2f} ms")
+    # 처음 접속 이후 seq 가 빠짐 / 중복 없이 이어져야 함
+    if not seqs or seqs != list(range(seqs[0], args.events + 1)) or connects < 2 or not replayed:
+        ok = False
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,44 @@
-import socket
-import time
-
-def main():
-    server_ip = "192.168.0.53"
-    port = 6050
-
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    s.bind((server_ip, port))
-    s.listen(1)
-    print("Waiting for client connection...")
-
-    c, addr = s.accept()
-    print(f"Client connected from {addr}!")
-
-    try:
-        while True:
-            data = "Connect".encode()
-            c.send(data)
-            time.sleep(1)
-    except KeyboardInterrupt:
-        print("\nServer shutting down...")
-    except Exception as e:
-        print(f"Error: {e}")
-    finally:
-        c.close()
-        s.close()
-        print("Socket closed. Port released.")
-
-if __name__ == "__main__":
-    main()
+import argparse
+import os
+import sys
+
+# mic_re_0410 의 감지 코드 / 전송 형식 사용
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mic_re_0410"))
+
+import detect_ver4
+from broadcast import HitBroadcaster, QUEUE_SIZE
+
+"""
+- 클라이언트 1개에 "Connect" 문자열만 보내던 서버 -> 타격 결과 실시간 방송 서버
+- detect_ver4 를 그대로 실행하면서 이벤트마다 연결된 모든 클라이언트에 HIT 프레임 전송 (broadcast.py)
+- 프레임 형식은 mic_re_0410/protocol.py, 1초마다 heartbeat
+- 실행: python3 mic_server.py [--host 192.168.0.53] [--port 6050] [detect_ver4 옵션 (--replay ...)]
+- 장비 없이 확인: python3 loopback_test.py
+"""
+
+SERVER_IP = "192.168.0.53"
+PORT = 6050
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default=SERVER_IP)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE, help="클라이언트별 대기 프레임 수")
+    args, detect_args = parser.parse_known_args()
+
+    server = HitBroadcaster(args.host, args.port, args.queue_size).start()
+    print(f"Broadcasting hits on {args.host}:{server.port}")
+
+    try:
+        detect_ver4.main(detect_args, on_event=server.publish)
+    finally:
+        stats = server.stats()
+        server.stop()
+        print(f"Server shutting down... published {stats['published']} events")
+        for addr, sent, dropped in server.disconnected:
+            if dropped:
+                print(f"  {addr}: sent {sent}, dropped {dropped} (slow client)")
+        print("Socket closed. Port released.")
+
+if __name__ == "__main__":
+    main()